@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class ForumConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.forum'
+    label = 'forum'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        # Замер SQL подключается к каждому новому соединению — до первого запроса к БД
+        import project.instrumentation  # noqa: F401
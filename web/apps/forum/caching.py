@@ -0,0 +1,119 @@
+import hashlib
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from project.db.routing import primary_reads
+
+from .pagination import page_cache_key
+
+# Страницы и фрагменты кешируются под ключами, в которые входят "штампы версий"
+# объектов (news:<id>, thread:<id>, ...). Любое изменение объекта меняет штамп,
+# и старые ключи просто перестают использоваться — удалять ничего не нужно.
+PAGE_CACHE_TIMEOUT = getattr(settings, 'PAGE_CACHE_TIMEOUT', 600)
+FRAGMENT_CACHE_TIMEOUT = getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 600)
+
+
+def _stamp_key(name):
+    return f'stamp:{name}'
+
+
+def get_version(*names):
+    keys = [_stamp_key(name) for name in names]
+    stamps = cache.get_many(keys)
+    for key in keys:
+        if key not in stamps:
+            # Штампа еще нет (или его вытеснили) — заводим новый
+            cache.add(key, uuid.uuid4().hex, None)
+            stamps[key] = cache.get(key)
+    return ':'.join(str(stamps[key]) for key in keys)
+
+
+def bump(*names):
+    cache.set_many({_stamp_key(name): uuid.uuid4().hex for name in names}, None)
+
+
+def stamps_for(obj):
+    """Штампы, которые устаревают при изменении объекта форума."""
+    from .models import Category, News, NewsComment, Thread, ThreadPost
+
+    if isinstance(obj, News):
+        return ['news', f'news:{obj.pk}']
+    if isinstance(obj, NewsComment):
+        return [f'news:{obj.news_id}']
+    if isinstance(obj, Thread):
+        return ['forum', f'category:{obj.category_id}', f'thread:{obj.pk}']
+    if isinstance(obj, ThreadPost):
+        if ThreadPost.thread.is_cached(obj):
+            category_id = obj.thread.category_id
+        else:
+            category_id = Thread.objects.filter(pk=obj.thread_id).values_list('category_id', flat=True).first()
+        return ['forum', f'category:{category_id}', f'thread:{obj.thread_id}']
+    if isinstance(obj, Category):
+        return ['forum', f'category:{obj.pk}']
+    return []
+
+
+def reaction_stamps_for(obj):
+    """Штампы страниц, на которых видны счетчики реакций объекта."""
+    from .models import News, NewsComment, Thread, ThreadPost
+
+    if isinstance(obj, News):
+        return ['news', f'news:{obj.pk}']
+    if isinstance(obj, NewsComment):
+        return [f'news:{obj.news_id}']
+    if isinstance(obj, Thread):
+        return [f'thread:{obj.pk}']
+    if isinstance(obj, ThreadPost):
+        return [f'thread:{obj.thread_id}']
+    return []
+
+
+def cached_fragment(name, stamps, builder, timeout=FRAGMENT_CACHE_TIMEOUT):
+    """Тяжелая общая часть страницы (список постов, дерево комментариев).
+
+    Кешируется одна копия на всех пользователей, личное (реакции, кнопки)
+    накладывается уже после получения из кеша.
+    """
+    raw = f'{name}|{get_version(*stamps)}'
+    key = f'fragment:{hashlib.md5(raw.encode()).hexdigest()}'
+    value = cache.get(key)
+    if value is None:
+        with primary_reads():
+            value = builder()
+        cache.set(key, value, timeout)
+    return value
+
+
+def cache_anonymous_page(stamps):
+    """Отдает страницу из кеша гостям (GET без логина).
+
+    stamps(request, **kwargs) возвращает список штампов, от которых зависит страница.
+    Ключ — путь и параметры постраничного вывода: другие параметры запроса
+    на такие страницы не влияют. Ответ повторяется вместе с заголовками вьюхи.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET' or request.user.is_authenticated:
+                return view(request, *args, **kwargs)
+
+            version = get_version(*stamps(request, *args, **kwargs))
+            raw = f'{request.path}|{page_cache_key(request)}|{version}'
+            key = f'page:{hashlib.md5(raw.encode()).hexdigest()}'
+
+            cached = cache.get(key)
+            if cached is not None:
+                content, headers = cached
+                return HttpResponse(content, headers=headers)
+
+            with primary_reads():
+                response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming:
+                cache.set(key, (response.content, dict(response.items())), PAGE_CACHE_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,134 @@
+import asyncio
+import json
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+from project.db.routing import primary_reads
+
+from .models import ChatMessage
+
+# Сколько последних сообщений отдаем при первом подключении
+CHAT_WINDOW = 50
+
+# Маркер "id и время последнего сообщения" в кеше: по нему опросы без
+# новых сообщений отвечают 304, не трогая БД. Обновляется при отправке,
+# а короткий таймаут страхует от неразделяемого между воркерами кеша.
+LATEST_MARKER_KEY = 'chat:latest'
+LATEST_MARKER_TIMEOUT = 30
+CHAT_WINDOW_TIMEOUT = 300
+
+
+def get_latest_marker():
+    marker = cache.get(LATEST_MARKER_KEY)
+    if marker is None:
+        with primary_reads():
+            marker = ChatMessage.objects.order_by('-id').values_list('id', 'created_at').first() or (0, None)
+        cache.set(LATEST_MARKER_KEY, marker, LATEST_MARKER_TIMEOUT)
+    return marker
+
+
+def set_latest_marker(msg):
+    cache.set(LATEST_MARKER_KEY, (msg.id, msg.created_at), LATEST_MARKER_TIMEOUT)
+
+
+def get_chat_window(latest_id):
+    """Последние CHAT_WINDOW сообщений: (список словарей, он же в JSON).
+
+    Ключ содержит id последнего сообщения, поэтому новое сообщение само
+    "сбрасывает" кеш, а все опрашивающие клиенты делят одну копию окна.
+    """
+    key = f'chat:window:{latest_id}'
+    window = cache.get(key)
+    if window is None:
+        with primary_reads():  # Окно уходит в общий кеш под id последнего сообщения
+            messages = list(ChatMessage.objects.select_related('author').order_by('-id')[:CHAT_WINDOW])
+        items = [serialize_message(msg) for msg in reversed(messages)]  # Старые сверху
+        window = (items, json.dumps(items))
+        cache.set(key, window, CHAT_WINDOW_TIMEOUT)
+    return window
+
+
+def serialize_message(msg):
+    return {
+        'id': msg.id,
+        'author': msg.author.username,
+        'author_id': msg.author_id,
+        'avatar': msg.author.avatar_thumb_url,
+        'content': msg.content,
+        'created_at': msg.created_at.strftime("%H:%M"),
+    }
+
+
+class Subscription:
+    """Сигнал потоку "есть новые сообщения". Сами сообщения поток читает из БД,
+    поэтому переполнение очереди ничего не теряет: сигнал уже ждет в ней."""
+
+    def __init__(self, loop, maxsize=100):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def _put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            pass
+
+    async def get(self, timeout):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def drain(self):
+        """Сбрасывает накопившиеся сигналы: один запрос к БД заберет все сообщения разом."""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+
+
+class InProcessBroadcaster:
+    """Рассылка новых сообщений чата открытым потокам внутри одного процесса.
+
+    publish() можно вызывать из синхронного кода (обычная вьюха в пуле
+    потоков), доставка идет в event loop каждого подписчика. Публикация только
+    будит потоки, сообщения они читают из БД. Потоки других процессов сигнал
+    не получат — они находят сообщение при следующем чтении из БД (не позже
+    чем через CHAT_STREAM_RESYNC_SECONDS). Для нескольких воркеров можно
+    подключить свой бэкенд через CHAT_BROADCASTER с тем же интерфейсом.
+    """
+
+    def __init__(self):
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        subscription = Subscription(asyncio.get_running_loop())
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, message):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._put, message)
+            except RuntimeError:
+                # Event loop подписчика уже закрыт
+                self.unsubscribe(subscription)
+
+
+_broadcaster = None
+_broadcaster_lock = threading.Lock()
+
+
+def get_broadcaster():
+    global _broadcaster
+    if _broadcaster is None:
+        with _broadcaster_lock:
+            if _broadcaster is None:
+                _broadcaster = import_string(settings.CHAT_BROADCASTER)()
+    return _broadcaster
@@ -0,0 +1,48 @@
+from django.conf import settings
+
+# Глубже этого уровня ветка не рисуется, вместо нее ссылка "Продолжить ветку"
+COMMENT_TREE_MAX_DEPTH = getattr(settings, 'COMMENT_TREE_MAX_DEPTH', 6)
+
+
+def build_comment_tree(comments, root_id=None, max_depth=COMMENT_TREE_MAX_DEPTH):
+    """Собирает плоский список комментариев новости в дерево за O(n).
+
+    Все комментарии новости достаются одним запросом (у них общий news_id),
+    а дерево собирается здесь по parent_id. Каждому комментарию проставляются
+    children, depth и hidden_replies (сколько ответов скрыто за лимитом глубины).
+    Корни возвращаются от новых к старым, ответы — от старых к новым.
+    Если передан root_id, возвращается только ветка этого комментария.
+    """
+    comments = list(comments)
+    by_id = {}
+    for comment in comments:
+        comment.children = []
+        comment.hidden_replies = 0
+        by_id[comment.pk] = comment
+
+    roots = []
+    for comment in comments:
+        parent = by_id.get(comment.parent_id)
+        if parent is not None:
+            parent.children.append(comment)
+        elif comment.parent_id is None:
+            roots.append(comment)
+
+    if root_id is not None:
+        roots = [by_id[root_id]] if root_id in by_id else []
+    else:
+        roots.reverse()
+
+    # Обход в ширину: проставляем глубину и обрезаем слишком глубокие ветки
+    level = [(node, 0) for node in roots]
+    while level:
+        next_level = []
+        for node, depth in level:
+            node.depth = depth
+            if depth + 1 >= max_depth and node.children:
+                node.hidden_replies = len(node.children)
+                node.children = []
+            next_level.extend((child, depth + 1) for child in node.children)
+        level = next_level
+
+    return roots
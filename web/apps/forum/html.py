@@ -0,0 +1,69 @@
+from html import unescape
+
+import bleach
+from bleach.css_sanitizer import CSSSanitizer
+from bleach.html5lib_shim import Filter
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+# Теги и атрибуты, которые может выдать Summernote с нашей панелью инструментов
+ALLOWED_TAGS = {
+    'a', 'div', 'p', 'span', 'img', 'em', 'i', 'li', 'ol', 'ul', 'strong', 'b', 'u', 'br', 'hr',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'blockquote', 'pre', 'code', 'sup', 'sub', 'strike',
+    'table', 'thead', 'tbody', 'tr', 'th', 'td',
+}
+ALLOWED_ATTRIBUTES = {
+    '*': ['title', 'align', 'style'],
+    'a': ['href', 'title', 'target', 'rel'],
+    'img': ['src', 'alt', 'width', 'height'],
+}
+ALLOWED_PROTOCOLS = {'http', 'https', 'mailto'}
+# Из style Summernote остаются выравнивание, размеры и обтекание картинок, цвета.
+# Свойств, принимающих url(), здесь нет
+ALLOWED_CSS_PROPERTIES = {
+    'text-align', 'width', 'height', 'float', 'margin-left', 'margin-right',
+    'color', 'background-color', 'text-decoration',
+}
+# Эти теги удаляются вместе с содержимым: strip=True оставил бы код скрипта текстом
+DROPPED_WITH_CONTENT = {'script', 'style'}
+
+EXCERPT_WORDS = 50
+
+
+class DropContentFilter(Filter):
+    """Выкидывает теги DROPPED_WITH_CONTENT и все, что между ними."""
+
+    def __iter__(self):
+        depth = 0
+        for token in super().__iter__():
+            if token.get('name') in DROPPED_WITH_CONTENT and token['type'] in ('StartTag', 'EndTag', 'EmptyTag'):
+                if token['type'] == 'StartTag':
+                    depth += 1
+                elif token['type'] == 'EndTag':
+                    depth = max(depth - 1, 0)
+                continue
+            if not depth:
+                yield token
+
+
+# script и style пропускает сам санитайзер (без атрибутов), чтобы фильтр увидел
+# их границы и вырезал целиком
+_cleaner = bleach.Cleaner(
+    tags=ALLOWED_TAGS | DROPPED_WITH_CONTENT, attributes=ALLOWED_ATTRIBUTES, protocols=ALLOWED_PROTOCOLS,
+    css_sanitizer=CSSSanitizer(allowed_css_properties=ALLOWED_CSS_PROPERTIES), strip=True,
+    filters=[DropContentFilter],
+)
+
+
+def sanitize_html(html):
+    return _cleaner.clean(html or '')
+
+
+def make_excerpt(html, words=EXCERPT_WORDS):
+    # То же, что раньше делал фильтр truncatewords_html:50 на каждом запросе
+    return Truncator(html).words(words, html=True, truncate='…')
+
+
+def html_to_text(html):
+    # Простой текст для поиска: без тегов и с раскрытыми сущностями (&lt; -> <)
+    return ' '.join(unescape(strip_tags(html or '')).split())
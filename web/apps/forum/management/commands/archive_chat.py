@@ -0,0 +1,55 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from apps.forum.models import ChatMessage, ChatMessageArchive
+
+FIELDS = ('id', 'author_id', 'content', 'created_at')
+
+
+class Command(BaseCommand):
+    help = ("Переносит сообщения чата старше CHAT_RETENTION_DAYS в архивную таблицу. "
+            "Работает пачками, каждая пачка — отдельная короткая транзакция")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.CHAT_RETENTION_DAYS,
+                            help="Срок хранения в днях (по умолчанию CHAT_RETENTION_DAYS)")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--pause', type=float, default=0.1, help="Пауза между пачками, секунды")
+        parser.add_argument('--dry-run', action='store_true', help="Только посчитать, ничего не переносить")
+
+    def _move_batch(self, cutoff, batch_size):
+        with transaction.atomic():
+            rows = list(ChatMessage.objects.filter(created_at__lt=cutoff)
+                        .order_by('id').values_list(*FIELDS)[:batch_size])
+            if not rows:
+                return 0
+            # ignore_conflicts: повторный запуск после сбоя не падает на уже перенесенных id
+            ChatMessageArchive.objects.bulk_create(
+                [ChatMessageArchive(**dict(zip(FIELDS, row))) for row in rows], ignore_conflicts=True)
+            ChatMessage.objects.filter(id__in=[row[0] for row in rows]).delete()
+        return len(rows)
+
+    def handle(self, *args, **options):
+        if options['days'] <= 0:
+            self.stdout.write("Архивация выключена (срок хранения 0)")
+            return
+        cutoff = timezone.now() - timedelta(days=options['days'])
+
+        if options['dry_run']:
+            count = ChatMessage.objects.filter(created_at__lt=cutoff).count()
+            self.stdout.write(f"К переносу: {count} сообщений старше {cutoff:%d.%m.%Y %H:%M}")
+            return
+
+        total = 0
+        while True:
+            moved = self._move_batch(cutoff, options['batch_size'])
+            total += moved
+            if moved < options['batch_size']:
+                break
+            time.sleep(options['pause'])  # Даем пройти записи новых сообщений
+        self.stdout.write(f"Перенесено в архив: {total}")
@@ -0,0 +1,59 @@
+import statistics
+import threading
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from apps.forum.chat import get_latest_marker
+
+
+class Command(BaseCommand):
+    help = ("Нагрузочный замер chat_get_messages: несколько параллельных клиентов "
+            "опрашивают чат с общим кешем окна и без него")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pollers', type=int, default=10, help="Число параллельных клиентов")
+        parser.add_argument('--requests', type=int, default=50, help="Запросов на одного клиента")
+
+    def _run(self, pollers, requests, cold):
+        timings, queries = [], []
+        lock = threading.Lock()
+
+        def poller():
+            client = Client()
+            local_timings, local_queries = [], []
+            for _ in range(requests):
+                if cold:
+                    # Как было раньше: окно собирается заново на каждый запрос
+                    cache.delete(f'chat:window:{get_latest_marker()[0]}')
+                with CaptureQueriesContext(connection) as ctx:
+                    started = time.perf_counter()
+                    client.get('/chat/get/', HTTP_HOST='localhost')
+                    local_timings.append((time.perf_counter() - started) * 1000)
+                local_queries.append(len(ctx.captured_queries))
+            connections.close_all()
+            with lock:
+                timings.extend(local_timings)
+                queries.extend(local_queries)
+
+        threads = [threading.Thread(target=poller) for _ in range(pollers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return timings, queries
+
+    def handle(self, *args, pollers, requests, **options):
+        for label, cold in (("без кеша окна", True), ("с кешем окна", False)):
+            timings, queries = self._run(pollers, requests, cold)
+            timings.sort()
+            self.stdout.write(
+                f"{label}: {len(timings)} запросов, "
+                f"p50 {statistics.median(timings):.2f} мс, "
+                f"p95 {timings[int(len(timings) * 0.95) - 1]:.2f} мс, "
+                f"запросов к БД в среднем {statistics.mean(queries):.2f}"
+            )
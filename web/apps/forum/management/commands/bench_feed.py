@@ -0,0 +1,71 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.template import Context, Template
+
+from apps.forum.models import News
+from apps.forum.pagination import KeysetPaginator
+from apps.forum.views import NEWS_PER_PAGE
+from apps.users.models import CustomUser
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ("Замер вывода ленты новостей: обрезка полного HTML на каждый запрос "
+            "против готового excerpt. Тестовые новости создаются в транзакции и откатываются. "
+            "Страница ленты — тот же запрос и пагинатор, что на главной (--per-page новостей); "
+            "рендерится только шаблон анонсов, без home.html: ему нужен запрос с пользователем")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--news', type=int, default=500, help="Сколько новостей создать")
+        parser.add_argument('--per-page', type=int, default=NEWS_PER_PAGE,
+                            help="Новостей на странице (по умолчанию как на главной)")
+        parser.add_argument('--paragraphs', type=int, default=100, help="Абзацев в теле новости")
+        parser.add_argument('--repeat', type=int, default=20, help="Повторов каждого варианта")
+
+    def _measure(self, repeat, render):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            render()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
+
+    def handle(self, *args, news, per_page, paragraphs, repeat, **options):
+        author = CustomUser.objects.first()
+        if author is None:
+            self.stderr.write("Нужен хотя бы один пользователь")
+            return
+
+        body = '<p>Абзац <b>новости</b> с <a href="https://example.com">ссылкой</a> и текстом.</p>' * paragraphs
+        old = Template('{% for n in items %}{{ n.content|safe|truncatewords_html:50 }}{% endfor %}')
+        new = Template('{% for n in items %}{{ n.excerpt|safe }}{% endfor %}')
+
+        try:
+            with transaction.atomic():
+                for i in range(news):
+                    News.objects.create(title=f'bench {i}', content=body, author=author)
+
+                def feed(queryset):
+                    return KeysetPaginator(queryset, per_page, descending=True).page().object_list
+
+                def render_old():
+                    # Как было: лента тянула content целиком и обрезала его в шаблоне
+                    old.render(Context({'items': feed(News.objects.select_related('author'))}))
+
+                def render_new():
+                    # Как в home(): content не загружается, выводится готовый excerpt
+                    new.render(Context({'items': feed(News.objects.select_related('author').defer('content'))}))
+
+                self.stdout.write(f"{news} новостей по {len(body) // 1024} КБ, на странице {per_page}")
+
+                self.stdout.write(f"обрезка на лету: p50 {self._measure(repeat, render_old):.2f} мс")
+                self.stdout.write(f"готовый excerpt: p50 {self._measure(repeat, render_new):.2f} мс")
+                raise _Rollback
+        except _Rollback:
+            pass
@@ -0,0 +1,147 @@
+import json
+import statistics
+import time
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from apps.forum.models import Category, News, Thread, ThreadPost
+
+
+def percentile(sorted_values, p):
+    index = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class Command(BaseCommand):
+    help = ("Замер основных страниц тестовым клиентом: перцентили времени ответа и число SQL-запросов "
+            "для гостя и залогиненного пользователя. Сравнивает с сохраненным эталоном и падает "
+            "при регрессии. Данные для замера — seed_forum")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=30, help="Замеров на каждую страницу")
+        parser.add_argument('--warmup', type=int, default=3, help="Прогревочных запросов (не считаются)")
+        parser.add_argument('--user', help="Пользователь для замеров с логином (по умолчанию первый обычный)")
+        parser.add_argument('--cold', action='store_true', help="Чистить кеш перед каждым запросом")
+        parser.add_argument('--only', nargs='*', help="Только эти страницы (например thread_detail chat)")
+        parser.add_argument('--baseline', default='bench_baseline.json', help="Файл эталона")
+        parser.add_argument('--save', action='store_true', help="Сохранить результаты как новый эталон")
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help="Допустимый рост p95, доля (0.25 = +25%%)")
+        parser.add_argument('--min-delta', type=float, default=1.0,
+                            help="Рост p95 меньше этого числа мс не считается регрессией (шум)")
+
+    # --- сценарии ---
+    def _targets(self):
+        category = Category.objects.order_by('-thread_count', 'pk').first()
+        thread = Thread.objects.annotate(n=Count('posts')).order_by('-n', 'pk').only('pk').first()
+        news = News.objects.annotate(n=Count('comments')).order_by('-n', 'pk').only('pk').first()
+        post = ThreadPost.objects.filter(thread=thread).order_by('-id').only('pk').first() if thread else None
+        if not (category and thread and news and post):
+            raise CommandError("В базе не хватает данных: запустите seed_forum")
+
+        # (имя, url, только для залогиненного)
+        return [
+            ('home', '/', False),
+            ('forum_index', '/forum/', False),
+            ('category_detail', f'/forum/cat/{category.pk}/', False),
+            ('category_detail_last', f'/forum/cat/{category.pk}/?last', False),
+            ('thread_detail', f'/forum/thread/{thread.pk}/', False),
+            ('thread_detail_last', f'/forum/thread/{thread.pk}/?last', False),
+            ('news_detail', f'/news/{news.pk}/', False),
+            ('chat_get_messages', '/chat/get/', False),
+            ('add_reaction', f'/reaction/post/{post.pk}/1/', True),
+        ]
+
+    def _user(self, username):
+        User = get_user_model()
+        if username:
+            return User.objects.get(username=username)
+        user = User.objects.filter(is_active=True, is_banned=False, is_superuser=False).order_by('pk').first()
+        if user is None:
+            raise CommandError("Нет пользователя для замеров с логином")
+        return user
+
+    def _measure(self, client, url, requests, warmup, cold):
+        timings, queries = [], []
+        for i in range(warmup + requests):
+            if cold:
+                cache.clear()
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                response = client.get(url, HTTP_HOST='localhost')
+                elapsed = (time.perf_counter() - started) * 1000
+            if response.status_code >= 400:
+                raise CommandError(f"{url}: ответ {response.status_code}")
+            if i >= warmup:
+                timings.append(elapsed)
+                queries.append(len(ctx.captured_queries))
+        timings.sort()
+        return {
+            'p50': round(statistics.median(timings), 2),
+            'p95': round(percentile(timings, 95), 2),
+            'p99': round(percentile(timings, 99), 2),
+            'queries': max(queries),
+        }
+
+    # --- сравнение с эталоном ---
+    def _regressions(self, result, base, tolerance, min_delta):
+        problems = []
+        limit = base['p95'] * (1 + tolerance)
+        if result['p95'] > limit and result['p95'] - base['p95'] > min_delta:
+            problems.append(f"p95 {base['p95']} -> {result['p95']} мс")
+        if result['queries'] > base['queries']:
+            problems.append(f"запросов {base['queries']} -> {result['queries']}")
+        return problems
+
+    def handle(self, *args, **options):
+        targets = self._targets()
+        if options['only']:
+            targets = [t for t in targets if any(word in t[0] for word in options['only'])]
+
+        clients = {'anon': Client(), 'user': Client()}
+        clients['user'].force_login(self._user(options['user']))
+
+        results = {}
+        # Сотни реакций подряд от одного пользователя — как раз то, что режет флуд-контроль
+        with override_settings(RATE_LIMIT_ENABLED=False):
+            for mode, client in clients.items():
+                for name, url, login_only in targets:
+                    if login_only and mode == 'anon':
+                        continue
+                    # Холодные замеры сравниваются только с холодным эталоном
+                    key = f'{name}:{mode}:cold' if options['cold'] else f'{name}:{mode}'
+                    results[key] = self._measure(client, url, options['requests'], options['warmup'],
+                                                 options['cold'])
+
+        baseline_path = Path(options['baseline'])
+        baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+
+        regressions = {}
+        self.stdout.write(f"{'страница':<35}{'p50':>9}{'p95':>9}{'p99':>9}{'SQL':>6}")
+        for key, result in results.items():
+            line = f"{key:<35}{result['p50']:>9.2f}{result['p95']:>9.2f}{result['p99']:>9.2f}{result['queries']:>6}"
+            base = baseline.get(key)
+            if base and not options['save']:
+                problems = self._regressions(result, base, options['tolerance'], options['min_delta'])
+                if problems:
+                    regressions[key] = problems
+                    line += '  РЕГРЕССИЯ: ' + ', '.join(problems)
+                else:
+                    line += f"  (эталон p95 {base['p95']}, SQL {base['queries']})"
+            self.stdout.write(line)
+
+        if options['save']:
+            # Дописываем, а не затираем: теплые и холодные замеры живут в одном файле
+            baseline_path.write_text(json.dumps({**baseline, **results}, indent=2, sort_keys=True))
+            self.stdout.write(f"Эталон сохранен в {baseline_path}")
+        elif not baseline:
+            self.stdout.write(f"Эталона {baseline_path} нет — запустите с --save, чтобы сохранить")
+        if regressions:
+            raise CommandError(f"Регрессия на {len(regressions)} страницах: {', '.join(regressions)}")
@@ -0,0 +1,38 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from apps.forum.models import Category, CategoryReadFloor, ThreadReadState
+from apps.forum.unread import current_maxima, mark_categories_read
+
+
+class Command(BaseCommand):
+    help = ("Чистит отметки прочтения: давно не заходившим пользователям весь форум отмечается "
+            "прочитанным, а отметки, уже перекрытые полом раздела, удаляются")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90, help="Сколько дней без входа считать неактивностью")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        category_ids = list(Category.objects.values_list('pk', flat=True))
+        maxima = current_maxima()
+
+        inactive = (get_user_model().objects
+                    .filter(Q(last_login__lt=cutoff) | Q(last_login__isnull=True, date_joined__lt=cutoff))
+                    .filter(thread_read_states__isnull=False).distinct())
+        users = 0
+        for user in inactive.only('pk').iterator():
+            mark_categories_read(user, category_ids, maxima)
+            users += 1
+
+        # Отметка не нужна, если и тема, и последний прочитанный пост не новее пола раздела
+        covered = CategoryReadFloor.objects.filter(
+            user=OuterRef('user'), category=OuterRef('thread__category'),
+            max_post_id__gte=OuterRef('last_read_post_id'), max_thread_id__gte=OuterRef('thread_id'))
+        deleted, _ = ThreadReadState.objects.filter(Exists(covered)).delete()
+
+        self.stdout.write(f"Неактивных пользователей: {users}, удалено лишних отметок: {deleted}")
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from apps.forum.models import News, Thread, ThreadPost
+
+
+class Command(BaseCommand):
+    help = "Заново чистит HTML и пересобирает анонсы (excerpt) у новостей, тем и постов"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, batch_size, **options):
+        for model in (News, Thread, ThreadPost):
+            done, batch = 0, []
+            for obj in model.objects.only('id', 'content').iterator(chunk_size=batch_size):
+                obj.render_content()
+                batch.append(obj)
+                if len(batch) >= batch_size:
+                    model.objects.bulk_update(batch, ['content', 'excerpt'])
+                    done += len(batch)
+                    batch = []
+            model.objects.bulk_update(batch, ['content', 'excerpt'])
+            done += len(batch)
+            self.stdout.write(f"{model._meta.label}: обработано {done}")
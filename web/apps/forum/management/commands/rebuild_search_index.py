@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.forum.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Пересобирает поисковый индекс по новостям, комментариям, темам и постам"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, batch_size, **options):
+        # В одной транзакции, чтобы поиск не оказался пустым на время пересборки
+        with transaction.atomic():
+            done = rebuild_index(batch_size)
+        for kind, count in done.items():
+            self.stdout.write(f"{kind}: проиндексировано {count}")
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from apps.forum.models import Category, Thread, ThreadPost
+
+
+def recount_category(category):
+    Category.objects.filter(pk=category.pk).update(
+        thread_count=Thread.objects.filter(category=category).count(),
+        post_count=ThreadPost.objects.filter(thread__category=category).count(),
+    )
+    category.refresh_last_activity()
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает число тем/сообщений и последнюю активность разделов форума"
+
+    def handle(self, *args, **options):
+        for category in Category.objects.all():
+            recount_category(category)
+            self.stdout.write(f"{category}: готово")
@@ -0,0 +1,46 @@
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from apps.forum.models import Reaction
+from apps.forum.reactions import REACTABLE_MODELS
+
+
+def _reaction_count(ct, value):
+    counts = (Reaction.objects
+              .filter(content_type=ct, object_id=OuterRef('pk'), value=value)
+              .order_by()
+              .values('object_id')
+              .annotate(c=Count('pk'))
+              .values('c'))
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает счетчики лайков/дизлайков по таблице Reaction"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help="Только проверить расхождения, ничего не меняя")
+
+    def handle(self, *args, check=False, **options):
+        total_drift = 0
+        for model in REACTABLE_MODELS:
+            ct = ContentType.objects.get_for_model(model)
+            likes = _reaction_count(ct, Reaction.LIKE)
+            dislikes = _reaction_count(ct, Reaction.DISLIKE)
+
+            drifted = (model.objects
+                       .annotate(real_likes=likes, real_dislikes=dislikes)
+                       .exclude(likes_count=F('real_likes'), dislikes_count=F('real_dislikes'))
+                       .values('pk'))
+            drift = drifted.count()
+            total_drift += drift
+
+            if drift and not check:
+                model.objects.filter(pk__in=drifted).update(likes_count=likes, dislikes_count=dislikes)
+            self.stdout.write(f"{model._meta.label}: расхождений {drift}")
+
+        if check and total_drift:
+            raise CommandError(f"Счетчики реакций расходятся в {total_drift} строках")
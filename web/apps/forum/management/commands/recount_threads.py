@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from apps.forum.models import Thread
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает последний пост, время и автора последнего ответа и число ответов в темах форума"
+
+    def handle(self, *args, **options):
+        updated = Thread.recount(Thread.objects.all())
+        self.stdout.write(f"Тем пересчитано: {updated}")
@@ -0,0 +1,221 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.forum.html import make_excerpt
+from apps.forum.models import Category, ChatMessage, News, NewsComment, Reaction, Thread, ThreadPost
+
+WORDS = ('форум сообщение тема новость сервер обновление вопрос ответ игра правила модератор '
+         'участник помощь ошибка версия клиент карта событие турнир команда идея обсуждение '
+         'спасибо вроде кажется точно быстро медленно сегодня вчера завтра').split()
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    # Иначе bulk_create проставит всем строкам created_at = сейчас (auto_now_add)
+    fields = [model._meta.get_field('created_at') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = ("Заполняет БД синтетическим форумом для замеров: пользователи, разделы, темы с "
+            "неравномерным числом постов, деревья комментариев, реакции и история чата. "
+            "Запускать на отдельной (пустой) БД")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--categories', type=int, default=10)
+        parser.add_argument('--threads', type=int, default=2000)
+        parser.add_argument('--posts', type=int, default=100000, help="Всего постов, делятся между темами по Парето")
+        parser.add_argument('--news', type=int, default=200)
+        parser.add_argument('--comments', type=int, default=20000, help="Всего комментариев к новостям")
+        parser.add_argument('--comment-depth', type=int, default=5, help="Глубина деревьев комментариев")
+        parser.add_argument('--reactions', type=int, default=200000)
+        parser.add_argument('--chat', type=int, default=20000)
+        parser.add_argument('--days', type=int, default=365, help="За какой период распределить даты")
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--prefix', default='seed', help="Префикс имен пользователей")
+        parser.add_argument('--seed', type=int, default=42, help="Зерно генератора, для повторяемых данных")
+        parser.add_argument('--no-index', action='store_true', help="Не пересобирать поисковый индекс")
+
+    # --- генерация ---
+    def _text(self, min_words, max_words):
+        return ' '.join(self.random.choices(WORDS, k=self.random.randint(min_words, max_words))).capitalize()
+
+    def _html(self):
+        paragraphs = self.random.randint(1, 5)
+        return ''.join(f'<p>{self._text(10, 60)}.</p>' for _ in range(paragraphs))
+
+    def _dates(self, count, start, end):
+        # Возрастают вместе с id, как в живой базе
+        span = (end - start).total_seconds()
+        return [start + timedelta(seconds=span * offset)
+                for offset in sorted(self.random.random() for _ in range(count))]
+
+    def _skewed(self, total, buckets, alpha=1.2):
+        # Распределение total по buckets с длинным хвостом: немного тем-гигантов и много маленьких
+        if not buckets:
+            return []
+        weights = [self.random.paretovariate(alpha) for _ in range(buckets)]
+        scale = total / sum(weights)
+        counts = [int(w * scale) for w in weights]
+        for i in self.random.sample(range(buckets), min(buckets, total - sum(counts))):
+            counts[i] += 1
+        return counts
+
+    def _bulk(self, model, objects):
+        created = []
+        for start in range(0, len(objects), self.batch_size):
+            created.extend(model.objects.bulk_create(objects[start:start + self.batch_size]))
+        return created
+
+    def _stage(self, label, started):
+        self.stdout.write(f"{label} ({time.monotonic() - started:.1f} с)")
+
+    # --- этапы ---
+    def _users(self, count, prefix):
+        User = get_user_model()
+        if User.objects.filter(username__startswith=f'{prefix}_').exists():
+            raise CommandError(f"Пользователи {prefix}_* уже есть — используйте другой --prefix или чистую БД")
+        password = make_password(prefix)  # Хешируем один раз, пароль у всех = префикс
+        users = self._bulk(User, [
+            User(username=f'{prefix}_{i}', email=f'{prefix}_{i}@example.com', password=password)
+            for i in range(count)
+        ])
+        return [user.pk for user in users]
+
+    def _categories(self, count):
+        categories = [Category(name=f'Раздел {i + 1}', description=self._text(3, 10)) for i in range(count)]
+        if categories:
+            categories[0].is_admin_only = True  # Один "блок администрации", как на живом форуме
+        return self._bulk(Category, categories)
+
+    def _threads(self, count, categories, users, start, end):
+        category_sizes = self._skewed(count, len(categories))
+        category_ids = [c.pk for c, size in zip(categories, category_sizes) for _ in range(size)]
+        self.random.shuffle(category_ids)
+        threads = []
+        for category_id, created_at in zip(category_ids, self._dates(len(category_ids), start, end)):
+            content = self._html()
+            threads.append(Thread(category_id=category_id, title=self._text(3, 8), content=content,
+                                  excerpt=make_excerpt(content), author_id=self.random.choice(users),
+                                  created_at=created_at))
+        return self._bulk(Thread, threads)
+
+    def _posts(self, count, threads, users, end):
+        sizes = self._skewed(count, len(threads))
+        batch, total = [], 0
+        for thread, size in zip(threads, sizes):
+            for created_at in self._dates(size, thread.created_at, end):
+                content = self._html()
+                batch.append(ThreadPost(thread_id=thread.pk, content=content, excerpt=make_excerpt(content),
+                                        author_id=self.random.choice(users), created_at=created_at))
+            if len(batch) >= self.batch_size:
+                total += len(self._bulk(ThreadPost, batch))
+                batch = []
+        total += len(self._bulk(ThreadPost, batch))
+        return total
+
+    def _news(self, count, users, start, end):
+        news = []
+        for created_at in self._dates(count, start, end):
+            content = self._html()
+            news.append(News(title=self._text(3, 8), content=content, excerpt=make_excerpt(content),
+                             author_id=self.random.choice(users), created_at=created_at))
+        return self._bulk(News, news)
+
+    def _comments(self, count, news, users, depth, end):
+        # Уровень за уровнем: ответам нужны id родителей из предыдущего уровня
+        sizes = self._skewed(count, len(news))
+        total = 0
+        for item, size in zip(news, sizes):
+            if not size:
+                continue
+            dates = iter(self._dates(size, item.created_at, end))
+            parents = [None]
+            remaining = size
+            for level in range(depth):
+                level_size = remaining if level == depth - 1 else max(1, int(remaining * 0.5))
+                level_size = min(level_size, remaining)
+                if not level_size:
+                    break
+                parents = self._bulk(NewsComment, [
+                    NewsComment(news_id=item.pk, author_id=self.random.choice(users), content=self._text(5, 40),
+                                parent=self.random.choice(parents), created_at=next(dates))
+                    for _ in range(level_size)
+                ])
+                remaining -= level_size
+                total += level_size
+        return total
+
+    def _reactions(self, count, users):
+        # Цели — все реагируемые объекты, у каждого свое число уникальных пользователей
+        targets = []
+        for model in (News, NewsComment, Thread, ThreadPost):
+            ct = ContentType.objects.get_for_model(model).pk
+            targets.extend((ct, pk) for pk in model.objects.values_list('pk', flat=True).iterator())
+        if not targets:
+            return 0
+        batch, total = [], 0
+        for (ct, object_id), size in zip(targets, self._skewed(count, len(targets))):
+            for user_id in self.random.sample(users, min(size, len(users))):
+                value = Reaction.LIKE if self.random.random() < 0.8 else Reaction.DISLIKE
+                batch.append(Reaction(user_id=user_id, value=value, content_type_id=ct, object_id=object_id))
+            if len(batch) >= self.batch_size:
+                total += len(self._bulk(Reaction, batch))
+                batch = []
+        total += len(self._bulk(Reaction, batch))
+        return total
+
+    def _chat(self, count, users, start, end):
+        return len(self._bulk(ChatMessage, [
+            ChatMessage(author_id=self.random.choice(users), content=self._text(1, 25), created_at=created_at)
+            for created_at in self._dates(count, start, end)
+        ]))
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        end = timezone.now()
+        start = end - timedelta(days=options['days'])
+        started = time.monotonic()
+
+        with explicit_timestamps(Thread, ThreadPost, News, NewsComment, ChatMessage):
+            users = self._users(options['users'], options['prefix'])
+            self._stage(f"Пользователи: {len(users)}", started)
+            categories = self._categories(options['categories'])
+            threads = self._threads(options['threads'], categories, users, start, end)
+            self._stage(f"Разделы: {len(categories)}, темы: {len(threads)}", started)
+            posts = self._posts(options['posts'], threads, users, end)
+            self._stage(f"Посты: {posts}", started)
+            news = self._news(options['news'], users, start, end)
+            comments = self._comments(options['comments'], news, users, options['comment_depth'], end)
+            self._stage(f"Новости: {len(news)}, комментарии: {comments}", started)
+            reactions = self._reactions(options['reactions'], users)
+            self._stage(f"Реакции: {reactions}", started)
+            chat = self._chat(options['chat'], users, start, end)
+            self._stage(f"Сообщения чата: {chat}", started)
+
+        # bulk_create не вызывает save() и сигналы — денормализацию досчитываем отдельно
+        call_command('recount_reactions', stdout=self.stdout)
+        call_command('recount_categories', stdout=self.stdout)
+        call_command('recount_threads', stdout=self.stdout)
+        if not options['no_index']:
+            call_command('rebuild_search_index', stdout=self.stdout)
+        cache.clear()
+        self._stage("Готово", started)
@@ -0,0 +1,79 @@
+# Generated by Django 5.0.14 on 2026-10-18 19:00
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    Reaction = apps.get_model('forum', 'Reaction')
+
+    for model_name in ('news', 'newscomment', 'thread', 'threadpost'):
+        model = apps.get_model('forum', model_name)
+        ct = ContentType.objects.filter(app_label='forum', model=model_name).first()
+        if ct is None:
+            continue
+
+        def count(value):
+            counts = (Reaction.objects
+                      .filter(content_type=ct, object_id=OuterRef('pk'), value=value)
+                      .order_by()
+                      .values('object_id')
+                      .annotate(c=Count('pk'))
+                      .values('c'))
+            return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+        model.objects.update(likes_count=count(1), dislikes_count=count(-1))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('forum', '0002_newscomment_parent_threadpost_parent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='news',
+            name='dislikes_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='news',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='newscomment',
+            name='dislikes_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='newscomment',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='thread',
+            name='dislikes_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='thread',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='threadpost',
+            name='dislikes_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='threadpost',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.14 on 2026-10-18 19:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0003_reaction_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='news',
+            index=models.Index(fields=['created_at', 'id'], name='forum_news_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='thread',
+            index=models.Index(fields=['category', 'created_at', 'id'], name='forum_thread_cat_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='threadpost',
+            index=models.Index(fields=['thread', 'created_at', 'id'], name='forum_post_thread_created_idx'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.0.14 on 2026-10-18 19:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_stats(apps, schema_editor):
+    Category = apps.get_model('forum', 'Category')
+    Thread = apps.get_model('forum', 'Thread')
+    ThreadPost = apps.get_model('forum', 'ThreadPost')
+
+    for category in Category.objects.all():
+        threads = Thread.objects.filter(category=category)
+        posts = ThreadPost.objects.filter(thread__category=category)
+        last_thread = threads.order_by('-created_at', '-id').first()
+        last_post = posts.order_by('-created_at', '-id').first()
+
+        latest, thread_id = None, None
+        if last_thread is not None:
+            latest, thread_id = last_thread, last_thread.pk
+        if last_post is not None and (latest is None or last_post.created_at > latest.created_at):
+            latest, thread_id = last_post, last_post.thread_id
+
+        category.thread_count = threads.count()
+        category.post_count = posts.count()
+        if latest is not None:
+            category.last_activity_at = latest.created_at
+            category.last_activity_thread_id = thread_id
+            category.last_activity_author_id = latest.author_id
+        category.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0004_keyset_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='last_activity_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='last_activity_author',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='last_activity_thread',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='forum.thread'),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='post_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='thread_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.0.14 on 2026-10-18 19:10
+
+from django.db import migrations, models
+
+from apps.forum.html import make_excerpt, sanitize_html
+
+
+MODELS = ('news', 'thread', 'threadpost')
+
+
+def fill_excerpts(apps, schema_editor):
+    # Что очистка изменила, сначала сохраняется как было в ContentBackup
+    ContentBackup = apps.get_model('forum', 'ContentBackup')
+    for model_name in MODELS:
+        model = apps.get_model('forum', model_name)
+        batch, backups = [], []
+        for obj in model.objects.only('id', 'content').iterator(chunk_size=500):
+            original = obj.content
+            obj.content = sanitize_html(original)
+            obj.excerpt = make_excerpt(obj.content)
+            if obj.content != original:
+                backups.append(ContentBackup(model=model_name, object_id=obj.pk, content=original))
+            batch.append(obj)
+            if len(batch) >= 500:
+                ContentBackup.objects.bulk_create(backups)
+                model.objects.bulk_update(batch, ['content', 'excerpt'])
+                batch, backups = [], []
+        ContentBackup.objects.bulk_create(backups)
+        model.objects.bulk_update(batch, ['content', 'excerpt'])
+
+
+def restore_content(apps, schema_editor):
+    ContentBackup = apps.get_model('forum', 'ContentBackup')
+    for model_name in MODELS:
+        model = apps.get_model('forum', model_name)
+        backups = ContentBackup.objects.filter(model=model_name).values_list('object_id', 'content')
+        batch = []
+        for object_id, content in backups.iterator(chunk_size=500):
+            batch.append(model(pk=object_id, content=content))
+            if len(batch) >= 500:
+                model.objects.bulk_update(batch, ['content'])
+                batch = []
+        model.objects.bulk_update(batch, ['content'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0005_category_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='news',
+            name='excerpt',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='thread',
+            name='excerpt',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='threadpost',
+            name='excerpt',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.CreateModel(
+            name='ContentBackup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('content', models.TextField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('model', 'object_id'),
+                                                        name='forum_contentbackup_uniq')],
+            },
+        ),
+        migrations.RunPython(fill_excerpts, restore_content),
+    ]
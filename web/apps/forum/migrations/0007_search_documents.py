@@ -0,0 +1,145 @@
+# Generated by Django 5.0.14 on 2026-10-18 19:12
+
+import django.contrib.postgres.search
+from html import unescape
+
+from django.db import migrations, models
+from django.utils.html import strip_tags
+
+# Поисковый индекс ведется триггерами в самой БД, поэтому любая запись
+# в forum_searchdocument (в том числе bulk_create) сразу попадает в поиск.
+POSTGRES_SQL = [
+    """
+    CREATE FUNCTION forum_searchdocument_vector() RETURNS trigger AS $$
+    BEGIN
+        NEW.vector := setweight(to_tsvector('russian', coalesce(NEW.title, '')), 'A')
+                   || setweight(to_tsvector('russian', coalesce(NEW.body, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER forum_searchdocument_vector_trg BEFORE INSERT OR UPDATE OF title, body
+    ON forum_searchdocument FOR EACH ROW EXECUTE PROCEDURE forum_searchdocument_vector()
+    """,
+    'CREATE INDEX forum_search_vector_gin ON forum_searchdocument USING gin (vector)',
+]
+POSTGRES_REVERSE_SQL = [
+    'DROP INDEX IF EXISTS forum_search_vector_gin',
+    'DROP TRIGGER IF EXISTS forum_searchdocument_vector_trg ON forum_searchdocument',
+    'DROP FUNCTION IF EXISTS forum_searchdocument_vector()',
+]
+
+SQLITE_SQL = [
+    """
+    CREATE VIRTUAL TABLE forum_searchdocument_fts USING fts5(
+        title, body, content='forum_searchdocument', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER forum_searchdocument_fts_ai AFTER INSERT ON forum_searchdocument BEGIN
+        INSERT INTO forum_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER forum_searchdocument_fts_ad AFTER DELETE ON forum_searchdocument BEGIN
+        INSERT INTO forum_searchdocument_fts(forum_searchdocument_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER forum_searchdocument_fts_au AFTER UPDATE ON forum_searchdocument BEGIN
+        INSERT INTO forum_searchdocument_fts(forum_searchdocument_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO forum_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+]
+SQLITE_REVERSE_SQL = [
+    'DROP TRIGGER IF EXISTS forum_searchdocument_fts_au',
+    'DROP TRIGGER IF EXISTS forum_searchdocument_fts_ad',
+    'DROP TRIGGER IF EXISTS forum_searchdocument_fts_ai',
+    'DROP TABLE IF EXISTS forum_searchdocument_fts',
+]
+
+
+def _run(schema_editor, statements):
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        _run(schema_editor, POSTGRES_SQL)
+    elif vendor == 'sqlite':
+        _run(schema_editor, SQLITE_SQL)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        _run(schema_editor, POSTGRES_REVERSE_SQL)
+    elif vendor == 'sqlite':
+        _run(schema_editor, SQLITE_REVERSE_SQL)
+
+
+def _text(html):
+    return ' '.join(unescape(strip_tags(html or '')).split())
+
+
+def fill_search_documents(apps, schema_editor):
+    SearchDocument = apps.get_model('forum', 'SearchDocument')
+    sources = [
+        ('news', apps.get_model('forum', 'News').objects.all(),
+         lambda obj: dict(title=obj.title, context='', container_id=None)),
+        ('comment', apps.get_model('forum', 'NewsComment').objects.select_related('news'),
+         lambda obj: dict(title='', context=obj.news.title, container_id=obj.news_id)),
+        ('thread', apps.get_model('forum', 'Thread').objects.all(),
+         lambda obj: dict(title=obj.title, context='', container_id=None)),
+        ('post', apps.get_model('forum', 'ThreadPost').objects.select_related('thread'),
+         lambda obj: dict(title='', context=obj.thread.title, container_id=obj.thread_id)),
+    ]
+    for kind, queryset, values in sources:
+        batch = []
+        for obj in queryset.iterator(chunk_size=500):
+            batch.append(SearchDocument(kind=kind, object_id=obj.pk, body=_text(obj.content),
+                                        created_at=obj.created_at, **values(obj)))
+            if len(batch) >= 500:
+                SearchDocument.objects.bulk_create(batch)
+                batch = []
+        SearchDocument.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0006_content_excerpts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('news', 'Новость'), ('comment', 'Комментарий'), ('thread', 'Тема'), ('post', 'Пост')], max_length=10)),
+                ('object_id', models.PositiveIntegerField()),
+                ('container_id', models.PositiveIntegerField(blank=True, null=True)),
+                ('title', models.CharField(blank=True, max_length=200)),
+                ('context', models.CharField(blank=True, max_length=200)),
+                ('body', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField()),
+                ('vector', django.contrib.postgres.search.SearchVectorField(editable=False, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'container_id'], name='forum_search_container_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='searchdocument',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='forum_search_kind_object_uniq'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(fill_search_documents, migrations.RunPython.noop),
+    ]
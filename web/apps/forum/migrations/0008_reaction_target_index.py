@@ -0,0 +1,20 @@
+# Generated by Django 5.0.14 on 2026-10-18 19:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('forum', '0007_search_documents'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reaction',
+            index=models.Index(fields=['content_type', 'object_id', 'value'], name='forum_reaction_target_idx'),
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.0.14 on 2026-10-18 19:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+from django.utils import timezone
+
+
+def backfill(apps, schema_editor):
+    Thread = apps.get_model('forum', 'Thread')
+    ThreadPost = apps.get_model('forum', 'ThreadPost')
+    Category = apps.get_model('forum', 'Category')
+    CategoryReadFloor = apps.get_model('forum', 'CategoryReadFloor')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+
+    latest = ThreadPost.objects.filter(thread=OuterRef('pk')).order_by('-id').values('id')[:1]
+    Thread.objects.update(last_post=Subquery(latest))
+
+    # Для уже зарегистрированных все существующее считается прочитанным
+    max_post_id = ThreadPost.objects.aggregate(m=Max('id'))['m'] or 0
+    max_thread_id = Thread.objects.aggregate(m=Max('id'))['m'] or 0
+    now = timezone.now()
+    category_ids = list(Category.objects.values_list('id', flat=True))
+    for user_id in User.objects.values_list('id', flat=True).iterator():
+        CategoryReadFloor.objects.bulk_create([
+            CategoryReadFloor(user_id=user_id, category_id=category_id, max_post_id=max_post_id,
+                              max_thread_id=max_thread_id, updated_at=now)
+            for category_id in category_ids
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0008_reaction_target_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='thread',
+            name='last_post',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='forum.threadpost'),
+        ),
+        migrations.CreateModel(
+            name='CategoryReadFloor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('max_post_id', models.BigIntegerField(default=0)),
+                ('max_thread_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='read_floors', to='forum.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='category_read_floors', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ThreadReadState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_read_post_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField()),
+                ('thread', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='read_states', to='forum.thread')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='thread_read_states', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='categoryreadfloor',
+            constraint=models.UniqueConstraint(fields=('user', 'category'), name='forum_readfloor_user_category_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='threadreadstate',
+            constraint=models.UniqueConstraint(fields=('user', 'thread'), name='forum_readstate_user_thread_uniq'),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
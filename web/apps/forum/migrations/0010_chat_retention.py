@@ -0,0 +1,37 @@
+# Generated by Django 5.0.14 on 2026-10-18 19:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0009_read_tracking'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatMessageArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('content', models.CharField(max_length=500)),
+                ('created_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Архивное сообщение чата',
+                'verbose_name_plural': 'Архив чата',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['created_at'], name='forum_chat_created_idx'),
+        ),
+        migrations.AddField(
+            model_name='chatmessagearchive',
+            name='author',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
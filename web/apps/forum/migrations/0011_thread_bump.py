@@ -0,0 +1,53 @@
+# Generated by Django 5.0.14 on 2026-10-18 19:49
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill(apps, schema_editor):
+    # То же, что Thread.recount, но на исторических моделях
+    Thread = apps.get_model('forum', 'Thread')
+    ThreadPost = apps.get_model('forum', 'ThreadPost')
+    posts = ThreadPost.objects.filter(thread=OuterRef('pk'))
+    latest = posts.order_by('-id')
+    Thread.objects.update(
+        last_post_at=Coalesce(Subquery(latest.values('created_at')[:1]), F('created_at')),
+        last_post_author=Coalesce(Subquery(latest.values('author_id')[:1]), F('author_id')),
+        reply_count=Coalesce(Subquery(posts.order_by().values('thread').annotate(n=Count('id')).values('n')),
+                             Value(0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0010_chat_retention'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='thread',
+            name='last_post_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AddField(
+            model_name='thread',
+            name='last_post_author',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='thread',
+            name='reply_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='thread',
+            index=models.Index(fields=['category', 'last_post_at', 'id'], name='forum_thread_cat_bump_idx'),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,11 @@
 from django.db import models
+from django.db.models import Case, Count, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .html import make_excerpt, sanitize_html
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
 from django.contrib.contenttypes.models import ContentType
 
@@ -19,24 +25,74 @@ class Reaction(models.Model):
 
     class Meta:
         unique_together = ('user', 'content_type', 'object_id')
+        # Реакции объекта: пересчет счетчиков и каскадное удаление через GenericRelation
+        indexes = [models.Index(fields=['content_type', 'object_id', 'value'], name='forum_reaction_target_idx')]
+
+
+# Базовый класс для всего, на что можно ставить реакции.
+# Счетчики хранятся прямо в строке и обновляются в toggle_reaction,
+# чтобы не считать COUNT(*) по Reaction для каждого объекта на странице.
+class Reactable(models.Model):
+    likes_count = models.PositiveIntegerField(default=0, editable=False)
+    dislikes_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def get_likes(self):
+        return self.likes_count
+
+    def get_dislikes(self):
+        return self.dislikes_count
+
+
+# Контент из Summernote: при сохранении чистится от опасной разметки,
+# а для списков сразу готовится короткий анонс (excerpt), чтобы не разбирать
+# весь HTML на каждом показе ленты.
+class RichContent(models.Model):
+    excerpt = models.TextField(blank=True, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def render_content(self):
+        self.content = sanitize_html(self.content)
+        self.excerpt = make_excerpt(self.content)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'content' in update_fields:
+            self.render_content()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'excerpt'}
+        super().save(*args, **kwargs)
+
+
+# Исходный HTML, который изменила первая очистка (миграция 0006). По нему
+# миграция откатывается; когда проверено, что ничего нужного не потеряно,
+# таблицу можно очистить
+class ContentBackup(models.Model):
+    model = models.CharField(max_length=20)  # news, thread, threadpost
+    object_id = models.BigIntegerField()
+    content = models.TextField()
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['model', 'object_id'], name='forum_contentbackup_uniq')]
 
 
 # === НОВОСТИ ===
-class News(models.Model):
+class News(Reactable, RichContent):
     title = models.CharField(max_length=200, verbose_name="Заголовок")
     content = models.TextField(verbose_name="Содержание")  # Summernote
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
     reactions = GenericRelation(Reaction)
 
-    def get_likes(self):
-        return self.reactions.filter(value=1).count()
-
-    def get_dislikes(self):
-        return self.reactions.filter(value=-1).count()
+    class Meta:
+        indexes = [models.Index(fields=['created_at', 'id'], name='forum_news_created_idx')]
 
 
-class NewsComment(models.Model):
+class NewsComment(Reactable):
     news = models.ForeignKey(News, related_name='comments', on_delete=models.CASCADE)
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     parent = models.ForeignKey('self', null=True, blank=True, related_name='replies', on_delete=models.CASCADE,
@@ -45,12 +101,6 @@ class NewsComment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     reactions = GenericRelation(Reaction)
 
-    def get_likes(self):
-        return self.reactions.filter(value=1).count()
-
-    def get_dislikes(self):
-        return self.reactions.filter(value=-1).count()
-
 
 # === ФОРУМ ===
 class Category(models.Model):
@@ -59,11 +109,48 @@ class Category(models.Model):
     is_admin_only = models.BooleanField(default=False, verbose_name="Блок администрации")
     is_feedback = models.BooleanField(default=False, verbose_name="Связь с администрацией")
 
+    # Денормализованная статистика для главной форума (обновляется в register_activity)
+    thread_count = models.PositiveIntegerField(default=0, editable=False)
+    post_count = models.PositiveIntegerField(default=0, editable=False)
+    last_activity_at = models.DateTimeField(null=True, blank=True, editable=False)
+    last_activity_thread = models.ForeignKey('Thread', null=True, blank=True, related_name='+',
+                                             on_delete=models.SET_NULL, editable=False)
+    last_activity_author = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, related_name='+',
+                                             on_delete=models.SET_NULL, editable=False)
+
     def __str__(self):
         return self.name
 
+    def register_activity(self, thread, author, at, new_threads=0, new_posts=0):
+        # Вызывается в той же транзакции, что и создание темы/поста
+        Category.objects.filter(pk=self.pk).update(
+            thread_count=F('thread_count') + new_threads,
+            post_count=F('post_count') + new_posts,
+            last_activity_at=at,
+            last_activity_thread=thread,
+            last_activity_author=author,
+        )
+
+    def refresh_last_activity(self):
+        """Пересчитывает последнюю активность раздела: самое свежее из "создана тема" и "написан пост"."""
+        last_thread = self.threads.order_by('-created_at', '-id').only('id', 'author_id', 'created_at').first()
+        last_post = (ThreadPost.objects.filter(thread__category=self)
+                     .order_by('-created_at', '-id').only('id', 'thread_id', 'author_id', 'created_at').first())
+
+        latest = max(filter(None, [last_thread, last_post]), key=lambda obj: obj.created_at, default=None)
+        if isinstance(latest, ThreadPost):
+            thread_id = latest.thread_id
+        else:
+            thread_id = latest.pk if latest else None
+
+        Category.objects.filter(pk=self.pk).update(
+            last_activity_at=latest.created_at if latest else None,
+            last_activity_thread_id=thread_id,
+            last_activity_author_id=latest.author_id if latest else None,
+        )
 
-class Thread(models.Model):
+
+class Thread(Reactable, RichContent):
     category = models.ForeignKey(Category, related_name='threads', on_delete=models.CASCADE)
     title = models.CharField(max_length=200)
     content = models.TextField()  # Первый пост темы
@@ -71,15 +158,55 @@ class Thread(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     is_closed = models.BooleanField(default=False)
     reactions = GenericRelation(Reaction)
+    # Последний (с наибольшим id) пост темы — с ним сравниваются отметки прочтения
+    last_post = models.ForeignKey('ThreadPost', null=True, blank=True, related_name='+',
+                                  on_delete=models.SET_NULL, editable=False)
+    # Денормализация для списка тем раздела: темы "поднимаются" ответами.
+    # Обновляется в register_reply, чинится командой recount_threads.
+    # Пока ответов нет — время создания и автор темы
+    last_post_at = models.DateTimeField(default=timezone.now, editable=False)
+    last_post_author = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, related_name='+',
+                                         on_delete=models.SET_NULL, editable=False)
+    reply_count = models.PositiveIntegerField(default=0, editable=False)
 
-    def get_likes(self):
-        return self.reactions.filter(value=1).count()
+    class Meta:
+        indexes = [
+            models.Index(fields=['category', 'created_at', 'id'], name='forum_thread_cat_created_idx'),
+            models.Index(fields=['category', 'last_post_at', 'id'], name='forum_thread_cat_bump_idx'),
+        ]
 
-    def get_dislikes(self):
-        return self.reactions.filter(value=-1).count()
+    def register_reply(self, post):
+        # Вызывается в той же транзакции, что и создание поста. Параллельные ответы
+        # коммитятся в любом порядке: последний пост меняем, только если этот новее
+        newer = Q(last_post__isnull=True) | Q(last_post_id__lt=post.pk)
 
+        def if_newer(value, name):
+            field = Thread._meta.get_field(name)
+            return Case(When(newer, then=Value(value)), default=F(name),
+                        output_field=field.target_field if field.is_relation else field)
 
-class ThreadPost(models.Model):
+        Thread.objects.filter(pk=self.pk).update(
+            last_post=if_newer(post.pk, 'last_post'),
+            last_post_at=if_newer(post.created_at, 'last_post_at'),
+            last_post_author=if_newer(post.author_id, 'last_post_author'),
+            reply_count=F('reply_count') + 1,
+        )
+
+    @staticmethod
+    def recount(threads):
+        """Пересчитывает последний пост и число ответов для набора тем одним UPDATE."""
+        posts = ThreadPost.objects.filter(thread=OuterRef('pk'))
+        latest = posts.order_by('-id')
+        return threads.update(
+            last_post=Subquery(latest.values('id')[:1]),
+            last_post_at=Coalesce(Subquery(latest.values('created_at')[:1]), F('created_at')),
+            last_post_author=Coalesce(Subquery(latest.values('author_id')[:1]), F('author_id')),
+            reply_count=Coalesce(Subquery(posts.order_by().values('thread').annotate(n=Count('id')).values('n')),
+                                 Value(0)),
+        )
+
+
+class ThreadPost(Reactable, RichContent):
     thread = models.ForeignKey(Thread, related_name='posts', on_delete=models.CASCADE)
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     # НОВОЕ ПОЛЕ
@@ -88,16 +215,92 @@ class ThreadPost(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     reactions = GenericRelation(Reaction)
 
-    def get_likes(self):
-        return self.reactions.filter(value=1).count()
+    class Meta:
+        indexes = [models.Index(fields=['thread', 'created_at', 'id'], name='forum_post_thread_created_idx')]
+
+
+# === ПРОЧИТАННОЕ ===
+# Отметка "прочитано до поста N" на пару пользователь-тема. Заводится только
+# для открытых пользователем тем, а "Отметить раздел прочитанным" заменяет
+# все отметки раздела одной строкой CategoryReadFloor (см. unread.py).
+class ThreadReadState(models.Model):
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='thread_read_states')
+    thread = models.ForeignKey(Thread, on_delete=models.CASCADE, related_name='read_states')
+    last_read_post_id = models.BigIntegerField(default=0)  # 0 — прочитан только первый пост темы
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['user', 'thread'], name='forum_readstate_user_thread_uniq')]
+
+
+# Все, что в разделе не новее этих id, пользователь считает прочитанным
+class CategoryReadFloor(models.Model):
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='category_read_floors')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='read_floors')
+    max_post_id = models.BigIntegerField(default=0)
+    max_thread_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['user', 'category'], name='forum_readfloor_user_category_uniq')]
 
-    def get_dislikes(self):
-        return self.reactions.filter(value=-1).count()
 
+# === ЧАТ ===
+# Живая таблица: окно и поток чата читают ее по первичному ключу (последние N,
+# id > N). Сообщения старше CHAT_RETENTION_DAYS команда archive_chat переносит
+# в ChatMessageArchive, так что таблица остается маленькой.
 class ChatMessage(models.Model):
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     content = models.CharField(max_length=500, verbose_name="Сообщение")
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # Для отбора старых сообщений при архивации
+        indexes = [models.Index(fields=['created_at'], name='forum_chat_created_idx')]
+
+    def __str__(self):
+        return f"{self.author}: {self.content[:20]}"
+
+
+# Архив чата: те же строки с теми же id. Индекс по автору нужен для удаления пользователя
+class ChatMessageArchive(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    content = models.CharField(max_length=500)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Архивное сообщение чата"
+        verbose_name_plural = "Архив чата"
+
     def __str__(self):
-        return f"{self.author}: {self.content[:20]}"
\ No newline at end of file
+        return f"{self.author_id}: {self.content[:20]}"
+
+
+# === ПОИСК ===
+# Одна строка на каждую новость, комментарий, тему и пост: текст без HTML
+# и поисковый индекс по нему. Индекс ведет сама БД триггерами (см. миграцию
+# 0007): на PostgreSQL это колонка vector (tsvector, GIN), на SQLite —
+# FTS5-таблица forum_searchdocument_fts. Заполняется в apps.forum.search.
+# На SQLite изменение схемы этой таблицы пересоздает ее вместе с триггерами —
+# после такой миграции триггеры нужно создать заново.
+class SearchDocument(models.Model):
+    NEWS = 'news'
+    COMMENT = 'comment'
+    THREAD = 'thread'
+    POST = 'post'
+    KINDS = ((NEWS, 'Новость'), (COMMENT, 'Комментарий'), (THREAD, 'Тема'), (POST, 'Пост'))
+
+    kind = models.CharField(max_length=10, choices=KINDS)
+    object_id = models.PositiveIntegerField()
+    # id новости (для комментария) или темы (для поста), в которых лежит объект
+    container_id = models.PositiveIntegerField(null=True, blank=True)
+    title = models.CharField(max_length=200, blank=True)
+    context = models.CharField(max_length=200, blank=True)  # Заголовок новости/темы для выдачи
+    body = models.TextField(blank=True)
+    created_at = models.DateTimeField()
+    vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['kind', 'object_id'], name='forum_search_kind_object_uniq')]
+        indexes = [models.Index(fields=['kind', 'container_id'], name='forum_search_container_idx')]
\ No newline at end of file
@@ -0,0 +1,146 @@
+import base64
+import binascii
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+# Параметры запроса, которые читает page_from_request
+PAGE_PARAMS = ('after', 'before', 'at', 'last')
+
+
+def page_cache_key(request):
+    """Только параметры постраничного вывода, в постоянном порядке — часть ключа кеша.
+
+    Посторонние параметры (?utm=..., ?x=<случайное>) на выдачу не влияют и не
+    должны плодить новые записи в кеше.
+    """
+    parts = []
+    for name in PAGE_PARAMS:
+        if name in request.GET:
+            # У last важен только факт наличия
+            parts.append(name if name == 'last' else f'{name}={request.GET[name]}')
+    return '&'.join(parts)
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """Постраничный вывод по курсору вместо OFFSET.
+
+    Страница ищется условием вида (created_at, id) > (курсор), которое
+    отрабатывает по составному индексу за одно и то же время на любой
+    странице. Курсор — значения ключей последней/первой строки страницы,
+    упакованные в base64.
+    """
+
+    def __init__(self, queryset, per_page, keys=('created_at', 'id'), descending=False):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.keys = keys
+        self.descending = descending
+
+    # --- курсоры ---
+    def encode_cursor(self, obj):
+        raw = '|'.join(str(getattr(obj, key)) for key in self.keys)
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+            parts = raw.split('|')
+            if len(parts) != len(self.keys):
+                return None
+            model = self.queryset.model
+            return [model._meta.get_field(key).to_python(part) for key, part in zip(self.keys, parts)]
+        except (binascii.Error, UnicodeDecodeError, ValidationError, ValueError):
+            return None
+
+    # --- запросы ---
+    def _ordering(self, forward):
+        desc = self.descending == forward
+        return [f'-{key}' if desc else key for key in self.keys]
+
+    def _seek(self, values, forward, inclusive=False):
+        # (a, b) > (x, y)  <=>  a > x OR (a = x AND b > y)
+        op = 'lt' if self.descending == forward else 'gt'
+        condition = Q()
+        for i, key in enumerate(self.keys):
+            last = i == len(self.keys) - 1
+            lookup = f'{key}__{op}e' if last and inclusive else f'{key}__{op}'
+            term = Q(**{lookup: values[i]}, **dict(zip(self.keys[:i], values[:i])))
+            condition |= term
+        return condition
+
+    def _exists(self, obj, forward):
+        values = [getattr(obj, key) for key in self.keys]
+        return self.queryset.filter(self._seek(values, forward)).exists()
+
+    def page(self, after=None, before=None, at=None, last=False):
+        """after — страница после курсора, before — перед курсором,
+        at — страница, начинающаяся с самой строки курсора (для постоянных ссылок),
+        last — последняя страница."""
+        after, before, at = self.decode_cursor(after), self.decode_cursor(before), self.decode_cursor(at)
+        per_page = self.per_page
+
+        if before is not None or (last and after is None and at is None):
+            qs = self.queryset
+            if before is not None:
+                qs = qs.filter(self._seek(before, forward=False))
+            items = list(qs.order_by(*self._ordering(forward=False))[:per_page + 1])
+            has_previous = len(items) > per_page
+            items = items[:per_page][::-1]
+            if not items:
+                # Перед курсором ничего нет (строки удалили) — отдаем первую страницу
+                return self.page() if before is not None else KeysetPage(items)
+            has_next = before is not None and self._exists(items[-1], forward=True)
+        else:
+            qs = self.queryset
+            cursor = after if after is not None else at
+            if cursor is not None:
+                qs = qs.filter(self._seek(cursor, forward=True, inclusive=after is None))
+            items = list(qs.order_by(*self._ordering(forward=True))[:per_page + 1])
+            has_next = len(items) > per_page
+            items = items[:per_page]
+            if not items:
+                return self.page(last=True) if cursor is not None else KeysetPage(items)
+            has_previous = cursor is not None and self._exists(items[0], forward=False)
+
+        return KeysetPage(
+            items,
+            next_cursor=self.encode_cursor(items[-1]) if has_next else None,
+            previous_cursor=self.encode_cursor(items[0]) if has_previous else None,
+        )
+
+    def page_from_request(self, request):
+        return self.page(
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+            at=request.GET.get('at'),
+            last='last' in request.GET,
+        )
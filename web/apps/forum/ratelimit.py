@@ -0,0 +1,110 @@
+import functools
+import hashlib
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import JsonResponse
+from django.shortcuts import render
+
+# Ограничение частоты запросов: "ведро с токенами" на пользователя и на IP.
+# Ведро емкостью N пополняется на N токенов за период, каждый запрос берет
+# один токен. Состояние лежит в кеше settings.RATE_LIMIT_CACHE, который
+# должен быть общим для воркеров (см. CACHES). Чтение и запись ведра не
+# атомарны: при гонке лимит может пропустить лишний запрос, это допустимо.
+
+_PERIODS = {'s': 1, 'm': 60, 'h': 3600}
+
+
+def parse_rate(rate):
+    """'10/m', '5/30s' -> (емкость, период в секундах)."""
+    count, period = rate.split('/')
+    number, unit = period[:-1] or '1', period[-1]
+    return int(count), int(number) * _PERIODS[unit]
+
+
+def client_ip(request):
+    if settings.RATE_LIMIT_TRUST_X_FORWARDED_FOR:
+        # Последний адрес в цепочке дописал наш nginx, ему можно верить
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+        if forwarded:
+            return forwarded.rsplit(',', 1)[-1].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def take_tokens(buckets, now=None):
+    """Берет по токену из каждого ведра [(ключ, лимит)] — из всех или ни из одного.
+
+    0 — можно, иначе через сколько секунд токены будут во всех ведрах. Отказ по
+    одному ведру не тратит токены других: пользователь за общим NAT-адресом,
+    упершийся в лимит IP, не опустошает заодно свое личное ведро.
+    """
+    cache = caches[settings.RATE_LIMIT_CACHE]
+    now = time.time() if now is None else now
+    states = cache.get_many([key for key, _ in buckets])
+
+    wait, updates = 0, []
+    for key, rate in buckets:
+        capacity, period = parse_rate(rate)
+        refill = capacity / period
+        tokens, updated = states.get(key) or (capacity, now)
+        tokens = min(capacity, tokens + (now - updated) * refill)
+        if tokens < 1:
+            wait = max(wait, (1 - tokens) / refill)
+        updates.append((key, tokens - 1, period))
+    if wait:
+        return wait
+    for key, tokens, period in updates:
+        # За период ведро наполняется полностью — дольше хранить незачем
+        cache.set(key, (tokens, now), timeout=period)
+    return 0
+
+
+def check_rate(request, name):
+    """Проверяет ведра пользователя и IP для лимита name. Возвращает Retry-After в секундах или 0."""
+    limits = settings.RATE_LIMITS.get(name, {})
+    buckets = []
+    if 'user' in limits and request.user.is_authenticated:
+        buckets.append((f'rl:{name}:u:{request.user.pk}', limits['user']))
+    if 'ip' in limits:
+        buckets.append((f'rl:{name}:ip:{client_ip(request)}', limits['ip']))
+    return math.ceil(take_tokens(buckets))
+
+
+def too_many_requests(request, retry_after, json=False):
+    message = f"Слишком часто. Попробуйте через {retry_after} с."
+    if json:
+        response = JsonResponse({'status': 'error', 'error': 'rate_limited', 'message': message}, status=429)
+    else:
+        response = render(request, 'forum/rate_limited.html', {'message': message}, status=429)
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def rate_limit(name, methods=('POST',), json=False):
+    """Декоратор вьюхи: лимит settings.RATE_LIMITS[name] для запросов с методами methods.
+
+    При превышении — ответ 429 с Retry-After (JSON, если json=True).
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if settings.RATE_LIMIT_ENABLED and request.method in methods:
+                retry_after = check_rate(request, name)
+                if retry_after:
+                    return too_many_requests(request, retry_after, json=json)
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def is_repeat(key, content, seconds):
+    """True, если content совпадает с предыдущим сообщением по ключу key за последние seconds секунд."""
+    cache = caches[settings.RATE_LIMIT_CACHE]
+    digest = hashlib.blake2b(content.strip().lower().encode(), digest_size=16).hexdigest()
+    cache_key = f'rl:repeat:{key}'
+    if cache.get(cache_key) == digest:
+        return True
+    cache.set(cache_key, digest, timeout=seconds)
+    return False
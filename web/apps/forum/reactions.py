@@ -0,0 +1,101 @@
+from collections import defaultdict
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from .caching import bump, reaction_stamps_for
+from .models import Reaction, News, NewsComment, Thread, ThreadPost
+
+REACTABLE_MODELS = (News, NewsComment, Thread, ThreadPost)
+
+# Тип объекта в URL реакции -> модель
+REACTION_TARGETS = {
+    'news': News,
+    'news_comment': NewsComment,
+    'thread': Thread,
+    'post': ThreadPost,
+}
+
+
+def _counter_field(value):
+    return 'likes_count' if value == Reaction.LIKE else 'dislikes_count'
+
+
+def toggle_reaction(user, obj, value):
+    """Ставит, переключает или снимает реакцию пользователя на объект.
+
+    Блокирует строку объекта, поэтому одновременные клики одного и того же
+    объекта выполняются по очереди и счетчики не расходятся с Reaction.
+    Возвращает итоговое значение реакции пользователя (0 — реакции нет);
+    obj получает новые likes_count/dislikes_count и my_reaction.
+    """
+    model = type(obj)
+    ct = ContentType.objects.get_for_model(model)  # Кешируется ContentTypeManager на весь процесс
+
+    with transaction.atomic():
+        locked = model.objects.select_for_update().only('pk', 'likes_count', 'dislikes_count').get(pk=obj.pk)
+        reaction = Reaction.objects.filter(user=user, content_type=ct, object_id=obj.pk).first()
+
+        deltas = {}
+        if reaction is None:
+            Reaction.objects.create(user=user, content_type=ct, object_id=obj.pk, value=value)
+            deltas[_counter_field(value)] = 1
+            state = value
+        elif reaction.value == value:
+            reaction.delete()  # Тоггл (убрать лайк)
+            deltas[_counter_field(value)] = -1
+            state = 0
+        else:
+            deltas[_counter_field(reaction.value)] = -1
+            deltas[_counter_field(value)] = 1
+            reaction.value = value
+            reaction.save(update_fields=['value'])
+            state = value
+
+        # Greatest не дает счетчику уйти в минус, если он уже разошелся с Reaction
+        model.objects.filter(pk=obj.pk).update(**{
+            field: F(field) + delta if delta > 0 else Greatest(F(field) + delta, 0)
+            for field, delta in deltas.items()
+        })
+        # Строка заблокирована, так что итоговые значения известны без повторного чтения
+        for field, delta in deltas.items():
+            setattr(locked, field, max(getattr(locked, field) + delta, 0))
+        obj.likes_count, obj.dislikes_count = locked.likes_count, locked.dislikes_count
+        obj.my_reaction = state
+
+        # Счетчики меняются через update(), сигналы не срабатывают — сбрасываем кеш сами
+        stamps = reaction_stamps_for(obj)
+        transaction.on_commit(lambda: bump(*stamps))
+
+    return state
+
+
+def load_reactions(objects, user):
+    """Проставляет объектам страницы реакцию текущего пользователя.
+
+    Объекты могут быть разных типов (News, NewsComment, Thread, ThreadPost).
+    Каждому выставляется my_reaction: 1, -1 или 0. Счетчики уже лежат
+    в строках, поэтому нужен один запрос к Reaction на каждый тип объектов,
+    независимо от размера страницы.
+    """
+    objects = list(objects)
+    for obj in objects:
+        obj.my_reaction = 0
+    if not objects or not user.is_authenticated:
+        return objects
+
+    by_model = defaultdict(list)
+    for obj in objects:
+        by_model[type(obj)].append(obj)
+
+    content_types = ContentType.objects.get_for_models(*by_model)
+    for model, items in by_model.items():
+        mine = dict(Reaction.objects
+                    .filter(user=user, content_type=content_types[model],
+                            object_id__in=[obj.pk for obj in items])
+                    .values_list('object_id', 'value'))
+        for obj in items:
+            obj.my_reaction = mine.get(obj.pk, 0)
+    return objects
@@ -0,0 +1,260 @@
+import re
+
+from django.db import connection
+from django.urls import reverse
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from apps.jobs.queue import enqueue_on_commit
+
+from .html import html_to_text
+from .models import News, NewsComment, SearchDocument, Thread, ThreadPost
+
+# Конфигурация полнотекстового поиска PostgreSQL (стемминг русского языка).
+# Та же строка зашита в триггер миграции 0007 — менять нужно вместе.
+SEARCH_CONFIG = 'russian'
+SEARCH_RESULTS_PER_PAGE = 20
+SEARCH_QUERY_MAX_LENGTH = 200
+
+KIND_MODELS = {
+    SearchDocument.NEWS: News,
+    SearchDocument.COMMENT: NewsComment,
+    SearchDocument.THREAD: Thread,
+    SearchDocument.POST: ThreadPost,
+}
+
+# Подсветку БД расставляет этими символами, а в HTML они превращаются
+# в <mark> уже после экранирования текста
+_MARK_START, _MARK_STOP = '\x02', '\x03'
+
+
+# --- индексация ---
+def document_values(obj):
+    """Поля SearchDocument для объекта форума (kind, object_id и defaults)."""
+    if isinstance(obj, News):
+        return SearchDocument.NEWS, dict(title=obj.title, context='', container_id=None,
+                                         body=html_to_text(obj.content), created_at=obj.created_at)
+    if isinstance(obj, NewsComment):
+        return SearchDocument.COMMENT, dict(title='', context=obj.news.title, container_id=obj.news_id,
+                                            body=html_to_text(obj.content), created_at=obj.created_at)
+    if isinstance(obj, Thread):
+        return SearchDocument.THREAD, dict(title=obj.title, context='', container_id=None,
+                                           body=html_to_text(obj.content), created_at=obj.created_at)
+    if isinstance(obj, ThreadPost):
+        return SearchDocument.POST, dict(title='', context=obj.thread.title, container_id=obj.thread_id,
+                                         body=html_to_text(obj.content), created_at=obj.created_at)
+    return None, None
+
+
+def index_object(obj):
+    kind, values = document_values(obj)
+    if kind is None:
+        return
+    SearchDocument.objects.update_or_create(kind=kind, object_id=obj.pk, defaults=values)
+    # Заголовок новости/темы показывается в выдаче у комментариев и постов
+    if kind == SearchDocument.NEWS:
+        SearchDocument.objects.filter(kind=SearchDocument.COMMENT, container_id=obj.pk).update(context=obj.title)
+    elif kind == SearchDocument.THREAD:
+        SearchDocument.objects.filter(kind=SearchDocument.POST, container_id=obj.pk).update(context=obj.title)
+
+
+def reindex_later(obj):
+    """После коммита ставит фоновую задачу обновить поисковый документ объекта (см. tasks.py)."""
+    for kind, model in KIND_MODELS.items():
+        if isinstance(obj, model):
+            enqueue_on_commit('forum.reindex', {'kind': kind, 'pk': obj.pk}, dedupe_key=f'reindex:{kind}:{obj.pk}')
+
+
+def rebuild_index(batch_size=500):
+    """Пересобирает поисковый индекс целиком. Возвращает {kind: число документов}."""
+    querysets = {
+        SearchDocument.NEWS: News.objects.all(),
+        SearchDocument.COMMENT: NewsComment.objects.select_related('news').defer('news__content',
+                                                                                  'news__excerpt'),
+        SearchDocument.THREAD: Thread.objects.defer('excerpt'),
+        SearchDocument.POST: ThreadPost.objects.select_related('thread').defer('thread__content',
+                                                                                'thread__excerpt'),
+    }
+    SearchDocument.objects.all().delete()
+    done = {}
+    for kind, queryset in querysets.items():
+        batch = []
+        done[kind] = 0
+        for obj in queryset.iterator(chunk_size=batch_size):
+            batch.append(SearchDocument(kind=kind, object_id=obj.pk, **document_values(obj)[1]))
+            if len(batch) >= batch_size:
+                SearchDocument.objects.bulk_create(batch)
+                done[kind] += len(batch)
+                batch = []
+        SearchDocument.objects.bulk_create(batch)
+        done[kind] += len(batch)
+    return done
+
+
+# --- поиск ---
+class SearchHit:
+    def __init__(self, kind, object_id, container_id, title, context, created_at, snippet, rank):
+        self.kind = kind
+        self.object_id = object_id
+        self.container_id = container_id
+        self.title = title
+        self.context = context
+        self.created_at = created_at
+        self.snippet = snippet
+        self.rank = rank
+
+    @property
+    def kind_label(self):
+        return dict(SearchDocument.KINDS)[self.kind]
+
+    @property
+    def url(self):
+        if self.kind == SearchDocument.NEWS:
+            return reverse('news_detail', args=[self.object_id])
+        if self.kind == SearchDocument.COMMENT:
+            return (reverse('news_detail', args=[self.container_id])
+                    + f'?comment={self.object_id}#comment-{self.object_id}')
+        if self.kind == SearchDocument.THREAD:
+            return reverse('thread_detail', args=[self.object_id])
+        return reverse('post_permalink', args=[self.object_id])
+
+    def as_dict(self):
+        return {
+            'kind': self.kind,
+            'id': self.object_id,
+            'title': self.title or self.context,
+            'url': self.url,
+            'snippet': str(self.snippet),
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+        }
+
+
+def _highlight(text):
+    return mark_safe(escape(text or '').replace(_MARK_START, '<mark>').replace(_MARK_STOP, '</mark>'))
+
+
+class PostgresSearchBackend:
+    """tsvector + GIN: websearch_to_tsquery с русским стеммингом, ранжирование ts_rank."""
+
+    def _queryset(self, query, kinds):
+        from django.contrib.postgres.search import SearchQuery
+
+        search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+        qs = SearchDocument.objects.filter(vector=search_query)
+        if kinds:
+            qs = qs.filter(kind__in=kinds)
+        return qs, search_query
+
+    def count(self, query, kinds):
+        return self._queryset(query, kinds)[0].count()
+
+    def fetch(self, query, kinds, offset, limit):
+        from django.contrib.postgres.search import SearchHeadline, SearchRank
+        from django.db.models import F
+
+        qs, search_query = self._queryset(query, kinds)
+        # ts_headline дорогой, и PostgreSQL считает его уже после LIMIT — только для строк страницы
+        rows = (qs.annotate(rank=SearchRank(F('vector'), search_query),
+                            snippet=SearchHeadline('body', search_query, config=SEARCH_CONFIG,
+                                                   start_sel=_MARK_START, stop_sel=_MARK_STOP,
+                                                   max_words=35, min_words=15, max_fragments=2))
+                .order_by('-rank', '-id')
+                .values_list('kind', 'object_id', 'container_id', 'title', 'context', 'created_at',
+                             'snippet', 'rank')[offset:offset + limit])
+        return [SearchHit(*row[:6], _highlight(row[6]), row[7]) for row in rows]
+
+
+class SqliteSearchBackend:
+    """FTS5 для разработки: тот же интерфейс, ранжирование bm25.
+
+    Стемминга в FTS5 нет, поэтому у русских слов отрезается окончание
+    и ищется префикс — грубо, но "новости" находит "новость".
+    """
+
+    _word_re = re.compile(r'\w+', re.UNICODE)
+    _ending_re = re.compile(r'[аеёиоуыэюяйь]+$')
+
+    def _match(self, query):
+        terms = []
+        for word in self._word_re.findall(query.lower()):
+            if len(word) > 4:
+                word = self._ending_re.sub('', word) or word
+            terms.append(f'"{word}"*')
+        return ' '.join(terms)
+
+    def _where(self, query, kinds):
+        sql = 'forum_searchdocument_fts MATCH %s'
+        params = [self._match(query)]
+        if kinds:
+            sql += f" AND d.kind IN ({', '.join(['%s'] * len(kinds))})"
+            params.extend(kinds)
+        return sql, params
+
+    def count(self, query, kinds):
+        if not self._match(query):
+            return 0
+        where, params = self._where(query, kinds)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT COUNT(*) FROM forum_searchdocument_fts '
+                'JOIN forum_searchdocument d ON d.id = forum_searchdocument_fts.rowid '
+                f'WHERE {where}', params)
+            return cursor.fetchone()[0]
+
+    def fetch(self, query, kinds, offset, limit):
+        if not self._match(query):
+            return []
+        where, params = self._where(query, kinds)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT d.id, snippet(forum_searchdocument_fts, 1, %s, %s, '…', 30), "
+                'bm25(forum_searchdocument_fts, 10.0, 1.0) AS rank '
+                'FROM forum_searchdocument_fts '
+                'JOIN forum_searchdocument d ON d.id = forum_searchdocument_fts.rowid '
+                f'WHERE {where} ORDER BY rank, d.id DESC LIMIT %s OFFSET %s',
+                [_MARK_START, _MARK_STOP] + params + [limit, offset])
+            rows = cursor.fetchall()
+        # Остальные поля через ORM, чтобы даты пришли с учетом часового пояса
+        docs = SearchDocument.objects.defer('body', 'vector').in_bulk([row[0] for row in rows])
+        return [SearchHit(docs[pk].kind, docs[pk].object_id, docs[pk].container_id, docs[pk].title,
+                          docs[pk].context, docs[pk].created_at, _highlight(snippet), -rank)
+                for pk, snippet, rank in rows]
+
+
+def get_backend():
+    if connection.vendor == 'postgresql':
+        return PostgresSearchBackend()
+    if connection.vendor == 'sqlite':
+        return SqliteSearchBackend()
+    raise NotImplementedError(f"Поиск не поддерживается для {connection.vendor}")
+
+
+class SearchResults:
+    """Ленивая выдача для django.core.paginator.Paginator: COUNT и страница
+    запрашиваются у бэкенда только когда нужны."""
+
+    def __init__(self, query, kinds=None):
+        self.query = query[:SEARCH_QUERY_MAX_LENGTH].strip()
+        self.kinds = [kind for kind in (kinds or []) if kind in KIND_MODELS]
+        self.backend = get_backend()
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = self.backend.count(self.query, self.kinds) if self.query else 0
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item:item + 1][0]
+        start, stop = item.start or 0, item.stop
+        if not self.query or stop is None or stop <= start:
+            return []
+        return self.backend.fetch(self.query, self.kinds, start, stop - start)
+
+
+def search(query, kinds=None):
+    return SearchResults(query, kinds)
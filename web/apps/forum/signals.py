@@ -0,0 +1,83 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .caching import bump, stamps_for
+from .models import Category, News, NewsComment, Thread, ThreadPost
+from .search import reindex_later
+from .unread import mark_categories_read
+
+
+# Любое сохранение/удаление контента (в том числе из админки: закрытие темы,
+# правка или удаление модератором) сбрасывает кеш связанных страниц
+@receiver([post_save, post_delete], sender=News)
+@receiver([post_save, post_delete], sender=NewsComment)
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Thread)
+@receiver([post_save, post_delete], sender=ThreadPost)
+def bump_page_cache(sender, instance, **kwargs):
+    stamps = stamps_for(instance)
+    transaction.on_commit(lambda: bump(*stamps))
+
+
+# Поисковый документ обновляет фоновая задача после коммита: смена заголовка
+# темы переписывает документы всех ее постов, это не должно держать запрос.
+# Сохранения без текста (закрытие темы и т.п.) индекс не трогают.
+@receiver(post_save, sender=News)
+@receiver(post_save, sender=NewsComment)
+@receiver(post_save, sender=Thread)
+@receiver(post_save, sender=ThreadPost)
+def update_search_document(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and not {'title', 'content'} & set(update_fields)):
+        return
+    reindex_later(instance)
+
+
+@receiver(post_delete, sender=News)
+@receiver(post_delete, sender=NewsComment)
+@receiver(post_delete, sender=Thread)
+@receiver(post_delete, sender=ThreadPost)
+def delete_search_document(sender, instance, **kwargs):
+    reindex_later(instance)
+
+
+# Удалили последний пост темы — FK обнулился (SET_NULL), пересчитываем тему целиком.
+# Иначе достаточно уменьшить счетчик ответов
+@receiver(post_delete, sender=ThreadPost)
+def update_thread_on_post_delete(sender, instance, **kwargs):
+    threads = Thread.objects.filter(pk=instance.thread_id)
+    if not Thread.recount(threads.filter(last_post__isnull=True)):
+        threads.update(reply_count=Greatest(F('reply_count') - 1, 0))
+
+
+# Удаление поста или темы (в том числе каскадом из админки) уменьшает счетчики раздела.
+# Последняя активность пересчитывается, только если удалили именно ее
+@receiver(post_delete, sender=ThreadPost)
+def update_category_on_post_delete(sender, instance, **kwargs):
+    categories = Category.objects.filter(threads=instance.thread_id)
+    categories.update(post_count=Greatest(F('post_count') - 1, 0))
+    category = categories.filter(last_activity_thread=instance.thread_id,
+                                 last_activity_at=instance.created_at).first()
+    if category is not None:
+        category.refresh_last_activity()
+
+
+# Посты удаленной темы уже вычтены обработчиком выше (каскад удаляет их раньше темы).
+# Ссылку на саму тему Django уже обнулил (SET_NULL)
+@receiver(post_delete, sender=Thread)
+def update_category_on_thread_delete(sender, instance, **kwargs):
+    categories = Category.objects.filter(pk=instance.category_id)
+    categories.update(thread_count=Greatest(F('thread_count') - 1, 0))
+    category = categories.filter(Q(last_activity_thread=None) | Q(last_activity_thread=instance.pk)).first()
+    if category is not None:
+        category.refresh_last_activity()
+
+
+# Новичку весь старый форум не показываем как непрочитанный
+@receiver(post_save, sender=get_user_model())
+def set_initial_read_floors(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        mark_categories_read(instance, list(Category.objects.values_list('pk', flat=True)))
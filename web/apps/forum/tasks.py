@@ -0,0 +1,14 @@
+from apps.jobs.queue import job
+
+from .models import SearchDocument
+from .search import KIND_MODELS, index_object
+
+
+@job('forum.reindex')
+def reindex(kind, pk):
+    # Берем объект заново: задача могла ждать в очереди, пока его правили или удаляли
+    obj = KIND_MODELS[kind].objects.filter(pk=pk).first()
+    if obj is None:
+        SearchDocument.objects.filter(kind=kind, object_id=pk).delete()
+    else:
+        index_object(obj)
@@ -0,0 +1,59 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from apps.forum.caching import cache_anonymous_page
+from apps.forum.pagination import page_cache_key
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class AnonymousPageCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+        @cache_anonymous_page(lambda request: ['news'])
+        def view(request):
+            self.calls += 1
+            response = HttpResponse(f'page {self.calls}', content_type='text/plain; charset=utf-8')
+            response['Cache-Control'] = 'max-age=60'
+            response['Vary'] = 'Accept-Language'
+            return response
+
+        self.view = view
+
+    def get(self, url):
+        request = RequestFactory().get(url)
+        request.user = AnonymousUser()
+        return self.view(request)
+
+    def test_headers_are_replayed(self):
+        first = self.get('/')
+        cached = self.get('/')
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(cached.content, first.content)
+        for header in ('Content-Type', 'Cache-Control', 'Vary'):
+            self.assertEqual(cached[header], first[header])
+
+    def test_unrelated_params_share_one_entry(self):
+        self.get('/')
+        self.get('/?x=123')
+        self.get('/?utm_source=mail&x=456')
+        self.assertEqual(self.calls, 1)
+
+    def test_pagination_params_are_separate_entries(self):
+        self.get('/?after=abc')
+        self.get('/?x=1&after=abc')
+        self.get('/?after=abd')
+        self.get('/?last=1')
+        self.get('/?last')
+        self.assertEqual(self.calls, 3)
+
+
+class PageCacheKeyTests(SimpleTestCase):
+    def test_fixed_order_and_only_page_params(self):
+        factory = RequestFactory()
+        self.assertEqual(page_cache_key(factory.get('/?at=c&x=1&after=b')), 'after=b&at=c')
+        self.assertEqual(page_cache_key(factory.get('/?after=b&at=c')), 'after=b&at=c')
+        self.assertEqual(page_cache_key(factory.get('/?page=2')), '')
@@ -0,0 +1,76 @@
+import asyncio
+import json
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+
+from apps.forum.chat import get_broadcaster, serialize_message
+from apps.forum.models import ChatMessage
+from apps.forum.views import _chat_event_stream, _chat_messages_after
+
+
+class ChatStreamConnectionTests(TransactionTestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user('chatter', password='x')
+        self.messages = [ChatMessage.objects.create(author=user, content=f"сообщение {i}") for i in range(3)]
+
+    def open_connections(self):
+        return [conn.alias for conn in connections.all(initialized_only=True) if conn.connection is not None]
+
+    def test_catch_up_releases_connection(self):
+        self.assertTrue(self.open_connections())
+        messages = async_to_sync(_chat_messages_after)(None)
+        self.assertEqual([m['id'] for m in messages], [m.pk for m in self.messages])
+        # Между догоняющими запросами поток не держит соединение (и место в пуле)
+        self.assertEqual(self.open_connections(), [])
+
+        messages = async_to_sync(_chat_messages_after)(self.messages[0].pk)
+        self.assertEqual([m['id'] for m in messages], [m.pk for m in self.messages[1:]])
+        self.assertEqual(self.open_connections(), [])
+
+
+# Без сигнала поток перечитывает БД раз в минуту: тест не должен дождаться этого
+@override_settings(CHAT_STREAM_RESYNC_SECONDS=60)
+class ChatStreamOrderingTests(TransactionTestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('chatter', password='x')
+        self.first = ChatMessage.objects.create(author=self.user, content="первое")
+
+    def create(self, content, publish, **fields):
+        message = ChatMessage.objects.create(author=self.user, content=content, **fields)
+        if publish:
+            get_broadcaster().publish(serialize_message(message))
+        return message.pk
+
+    async def next_message(self, stream):
+        while True:
+            chunk = await asyncio.wait_for(stream.__anext__(), 5)
+            if chunk.startswith('id:'):
+                return json.loads(chunk.split('data: ', 1)[1])['id']
+
+    def test_two_publishers(self):
+        create = sync_to_async(self.create)
+
+        async def scenario():
+            stream = _chat_event_stream(None)
+            await stream.__anext__()  # retry:
+            got = [await self.next_message(stream)]  # Окно последних сообщений
+            received = asyncio.ensure_future(self.next_message(stream))
+            await asyncio.sleep(0.1)
+            # Другой воркер: сообщение в БД, но сигнала этому процессу нет
+            other = await create("из другого воркера", publish=False)
+            # Этот воркер: сообщение с большим id и сигнал
+            local = await create("из этого воркера", publish=True)
+            got += [await received, await self.next_message(stream)]
+            # Коммит не по порядку id: сначала большее, потом меньшее
+            later = await create("id больше", publish=True, id=local + 10)
+            got.append(await self.next_message(stream))
+            earlier = await create("id меньше", publish=True, id=local + 5)
+            got.append(await self.next_message(stream))
+            await stream.aclose()
+            return got, [self.first.pk, other, local, later, earlier]
+
+        got, expected = async_to_sync(scenario)()
+        self.assertEqual(got, expected)
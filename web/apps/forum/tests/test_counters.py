@@ -0,0 +1,65 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.forum.models import Category, Thread, ThreadPost
+
+
+class CategoryCountersOnDeleteTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('author', password='x')
+        self.category = Category.objects.create(name="Раздел")
+        self.now = timezone.now()
+        self.old = self.make_thread("Старая", self.now - timedelta(hours=2), replies=1)
+        self.new = self.make_thread("Новая", self.now - timedelta(hours=1), replies=2)
+
+    def make_thread(self, title, at, replies):
+        thread = Thread.objects.create(category=self.category, title=title, content="<p>текст</p>", author=self.user)
+        Thread.objects.filter(pk=thread.pk).update(created_at=at)
+        thread.refresh_from_db()
+        self.category.register_activity(thread, self.user, at, new_threads=1)
+        for minute in range(1, replies + 1):
+            post = ThreadPost.objects.create(thread=thread, author=self.user, content="<p>ответ</p>")
+            ThreadPost.objects.filter(pk=post.pk).update(created_at=at + timedelta(minutes=minute))
+            post.refresh_from_db()
+            thread.register_reply(post)
+            self.category.register_activity(thread, self.user, post.created_at, new_posts=1)
+        return thread
+
+    def assertCategory(self, threads, posts, thread, at):
+        category = Category.objects.get(pk=self.category.pk)
+        self.assertEqual((category.thread_count, category.post_count), (threads, posts))
+        self.assertEqual((category.last_activity_thread_id, category.last_activity_at), (thread, at))
+
+    def test_delete_last_post(self):
+        self.new.posts.order_by('-id').first().delete()
+        self.assertCategory(2, 2, self.new.pk, self.now - timedelta(hours=1) + timedelta(minutes=1))
+
+    def test_delete_older_post_keeps_last_activity(self):
+        self.old.posts.get().delete()
+        self.assertCategory(2, 2, self.new.pk, self.now - timedelta(hours=1) + timedelta(minutes=2))
+
+    def test_delete_thread_with_posts(self):
+        self.new.delete()
+        self.assertCategory(1, 1, self.old.pk, self.now - timedelta(hours=2) + timedelta(minutes=1))
+        self.old.delete()
+        self.assertCategory(0, 0, None, None)
+
+
+class RegisterReplyTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('author', password='x')
+        category = Category.objects.create(name="Раздел")
+        self.thread = Thread.objects.create(category=category, title="Тема", content="<p>текст</p>", author=self.user)
+
+    def test_older_reply_committed_later_keeps_last_post(self):
+        older = ThreadPost.objects.create(thread=self.thread, author=self.user, content="<p>1</p>")
+        newer = ThreadPost.objects.create(thread=self.thread, author=self.user, content="<p>2</p>")
+        # Второй ответ закоммитился раньше первого
+        self.thread.register_reply(newer)
+        self.thread.register_reply(older)
+        self.thread.refresh_from_db()
+        self.assertEqual((self.thread.last_post_id, self.thread.last_post_at), (newer.pk, newer.created_at))
+        self.assertEqual(self.thread.reply_count, 2)
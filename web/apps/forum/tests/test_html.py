@@ -0,0 +1,26 @@
+from django.test import SimpleTestCase
+
+from apps.forum.html import sanitize_html
+
+
+class SanitizeHtmlTests(SimpleTestCase):
+    def test_keeps_summernote_alignment_and_image_size(self):
+        self.assertEqual(sanitize_html('<p style="text-align: center">x</p>'), '<p style="text-align: center;">x</p>')
+        self.assertEqual(sanitize_html('<img src="https://a/b.png" style="width: 50%; float: left">'),
+                         '<img src="https://a/b.png" style="width: 50%; float: left;">')
+
+    def test_drops_unsafe_css(self):
+        self.assertEqual(sanitize_html('<p style="position: fixed; background-image: url(x)">x</p>'),
+                         '<p style="">x</p>')
+
+    def test_drops_script_and_style_with_content(self):
+        self.assertEqual(sanitize_html('a<script>alert(1)</script>b<style>p {}</style>c'), 'abc')
+        self.assertEqual(sanitize_html('<p>1<script>x<b>y</b></script>2</p>'), '<p>12</p>')
+
+    def test_strips_other_tags_and_handlers(self):
+        self.assertEqual(sanitize_html('<iframe src="x">t</iframe><a href="javascript:x" onclick="y">l</a>'),
+                         't<a>l</a>')
+
+    def test_idempotent(self):
+        html = '<p style="text-align: right;">x<img src="https://a/b.png" style="width: 25%;"></p>'
+        self.assertEqual(sanitize_html(sanitize_html(html)), sanitize_html(html))
@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from apps.forum.ratelimit import check_rate, take_tokens
+
+
+class User:
+    is_authenticated = True
+
+    def __init__(self, pk):
+        self.pk = pk
+
+
+@override_settings(RATE_LIMITS={'post': {'user': '2/m', 'ip': '3/m'}})
+class RateLimitTests(SimpleTestCase):
+    def setUp(self):
+        caches[settings.RATE_LIMIT_CACHE].clear()
+
+    def request(self, user):
+        request = RequestFactory().post('/', REMOTE_ADDR='10.0.0.1')
+        request.user = user
+        return request
+
+    def test_rejected_request_takes_no_tokens(self):
+        alice, bob = User(1), User(2)
+        self.assertEqual(check_rate(self.request(alice), 'post'), 0)
+        self.assertEqual(check_rate(self.request(bob), 'post'), 0)
+        self.assertEqual(check_rate(self.request(bob), 'post'), 0)
+        # Общий IP исчерпан: отказ не тратит личный токен alice
+        self.assertGreater(check_rate(self.request(alice), 'post'), 0)
+        self.assertGreater(check_rate(self.request(AnonymousUser()), 'post'), 0)
+        self.assertEqual(take_tokens([('rl:post:u:1', '2/m')]), 0)
+
+    def test_all_buckets_must_allow(self):
+        buckets = [('a', '1/m'), ('b', '5/m')]
+        self.assertEqual(take_tokens(buckets, now=0), 0)
+        self.assertAlmostEqual(take_tokens(buckets, now=1), 59)
+        self.assertEqual(take_tokens([('b', '5/m')], now=1), 0)
+        # Отказ по "a" токен "b" не взял: 5 - 1 - 1 плюс пополнение за секунду
+        self.assertAlmostEqual(caches[settings.RATE_LIMIT_CACHE].get('b')[0], 3 + 5 / 60)
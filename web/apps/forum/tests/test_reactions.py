@@ -0,0 +1,99 @@
+import random
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db import OperationalError, connection, connections
+from django.db.models import Count, Q
+from django.test import Client, TransactionTestCase
+from django.urls import reverse
+
+from apps.forum.models import Category, Reaction, Thread
+from apps.forum.reactions import toggle_reaction
+
+
+def with_retry(action, *args):
+    # SQLite не ждет, а сразу отказывает второй пишущей транзакции ("database is locked").
+    # На PostgreSQL конкурирующие клики ждут блокировку строки и повтор не нужен
+    for _ in range(50):
+        try:
+            return action(*args)
+        except OperationalError:
+            if connection.vendor != 'sqlite':
+                raise
+            time.sleep(random.uniform(0.001, 0.01))
+    raise AssertionError(f"{action.__name__} не прошел за 50 попыток")
+
+
+class ConcurrentToggleTests(TransactionTestCase):
+    USERS = 8
+    CLICKS = 6
+
+    def setUp(self):
+        User = get_user_model()
+        self.users = [User.objects.create_user(f'user{i}', password='x') for i in range(self.USERS)]
+        category = Category.objects.create(name="Общий")
+        self.thread = Thread.objects.create(category=category, title="Тема", content="<p>текст</p>",
+                                            author=self.users[0])
+
+    def run_clicks(self, click):
+        """Все пользователи одновременно жмут кнопки: click(user, value) CLICKS раз каждый."""
+        errors, start = [], threading.Barrier(self.USERS)
+
+        def worker(user, seed):
+            rnd = random.Random(seed)
+            start.wait()
+            try:
+                for _ in range(self.CLICKS):
+                    click(user, rnd.choice([Reaction.LIKE, Reaction.DISLIKE]))
+            except Exception as exc:  # noqa: BLE001 — ошибку потока показываем в тесте
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        workers = [threading.Thread(target=worker, args=(user, i)) for i, user in enumerate(self.users)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def assertCountersMatchReactions(self):
+        actual = Reaction.objects.filter(content_type=ContentType.objects.get_for_model(Thread),
+                                         object_id=self.thread.pk).aggregate(
+            likes=Count('pk', filter=Q(value=Reaction.LIKE)),
+            dislikes=Count('pk', filter=Q(value=Reaction.DISLIKE)))
+        self.thread.refresh_from_db()
+        self.assertEqual((self.thread.likes_count, self.thread.dislikes_count),
+                         (actual['likes'], actual['dislikes']))
+
+    def test_counters_match_reactions(self):
+        # Свежий объект на каждый клик, как в запросе
+        self.run_clicks(lambda user, value: with_retry(toggle_reaction, user,
+                                                       Thread.objects.get(pk=self.thread.pk), value))
+        self.assertCountersMatchReactions()
+
+    def test_api_counters_match_reactions(self):
+        clients = {}
+        for user in self.users:
+            clients[user] = Client()
+            clients[user].force_login(user)
+
+        def click(user, value):
+            url = reverse('reaction_api', args=['thread', self.thread.pk, str(value)])
+            response = with_retry(clients[user].post, url)
+            if response.status_code != 200:
+                raise AssertionError(f"{url}: {response.status_code}")
+
+        self.run_clicks(click)
+        self.assertCountersMatchReactions()
+
+    def test_toggle_states(self):
+        user = self.users[0]
+        self.assertEqual(toggle_reaction(user, self.thread, Reaction.LIKE), Reaction.LIKE)
+        self.assertEqual(toggle_reaction(user, self.thread, Reaction.DISLIKE), Reaction.DISLIKE)
+        self.assertEqual((self.thread.likes_count, self.thread.dislikes_count), (0, 1))
+        self.assertEqual(toggle_reaction(user, self.thread, Reaction.DISLIKE), 0)
+        self.thread.refresh_from_db()
+        self.assertEqual((self.thread.likes_count, self.thread.dislikes_count), (0, 0))
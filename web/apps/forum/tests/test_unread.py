@@ -0,0 +1,66 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from apps.forum.models import Category, Thread, ThreadPost
+from apps.forum.unread import (get_floor, is_unread, mark_categories_read, mark_thread_read, unread_counts,
+                               with_read_state)
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class UnreadCountsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.user = User.objects.create_user('reader', password='x')
+        author = User.objects.create_user('author', password='x')
+        cls.fresh = Category.objects.create(name="Без пола")
+        cls.floored = Category.objects.create(name="С полом")
+        cls.empty = Category.objects.create(name="Пустой")
+
+        def thread(category, replies):
+            thread = Thread.objects.create(category=category, title="Тема", content="<p>т</p>", author=author)
+            for _ in range(replies):
+                post = ThreadPost.objects.create(thread=thread, author=author, content="<p>ответ</p>")
+                thread.register_reply(post)
+            thread.refresh_from_db()
+            return thread
+
+        # До пола: прочитаны, пока в них не появятся новые посты
+        thread(cls.floored, 1)
+        old_active = thread(cls.floored, 1)
+        thread(cls.fresh, 0)
+        mark_categories_read(cls.user, [cls.floored.pk])
+        for _ in range(2):
+            old_active.register_reply(ThreadPost.objects.create(thread=old_active, author=author, content="<p>н</p>"))
+        # После пола: новая тема, открытая и дочитанная тема, открытая тема с новым постом
+        thread(cls.floored, 0)
+        read = thread(cls.floored, 2)
+        mark_thread_read(cls.user, read.pk, read.last_post_id)
+        opened = thread(cls.fresh, 2)
+        mark_thread_read(cls.user, opened.pk, opened.posts.order_by('id').first().pk)
+        thread(cls.fresh, 1)
+
+    def expected(self):
+        counts = {}
+        for thread in with_read_state(Thread.objects.all(), self.user):
+            floor = get_floor(self.user, thread.category_id)
+            if is_unread(thread.last_post_id, thread.read_post_id, *floor, thread.pk):
+                counts[thread.category_id] = counts.get(thread.category_id, 0) + 1
+        return counts
+
+    def test_matches_is_unread(self):
+        category_ids = [self.fresh.pk, self.floored.pk, self.empty.pk]
+        expected = self.expected()
+        self.assertEqual(expected, {self.fresh.pk: 3, self.floored.pk: 2})
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(unread_counts(self.user, category_ids), expected)
+        # Полы разделов и один запрос, который сам считает темы по разделам
+        self.assertEqual(len(queries), 2)
+        self.assertIn('COUNT(', queries[1]['sql'])
+        self.assertIn('GROUP BY', queries[1]['sql'])
+
+    def test_floor_applies_only_to_its_category(self):
+        self.assertEqual(unread_counts(self.user, [self.floored.pk]), {self.floored.pk: 2})
+        self.assertEqual(unread_counts(self.user, []), {})
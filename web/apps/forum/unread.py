@@ -0,0 +1,115 @@
+from django.db import connection
+from django.db.models import Count, F, FilteredRelation, Max, Q
+from django.utils import timezone
+
+from .models import CategoryReadFloor, Thread, ThreadPost, ThreadReadState
+
+# Что считается непрочитанным.
+# У темы есть last_post_id (последний пост), у пользователя — отметка по теме
+# (last_read_post_id, если тему открывал) и "пол" раздела (max_post_id/max_thread_id:
+# все, что не новее, прочитано). Тема непрочитана, если:
+#   - тему открывали, и последний пост новее и отметки, и пола;
+#   - тему не открывали, и она сама новее пола или в ней есть посты новее пола.
+
+
+def is_unread(last_post_id, read_post_id, floor_post_id, floor_thread_id, thread_id):
+    last_post_id = last_post_id or 0
+    if read_post_id is not None:
+        return last_post_id > max(read_post_id, floor_post_id)
+    return thread_id > floor_thread_id or last_post_id > floor_post_id
+
+
+def with_read_state(threads, user):
+    """Добавляет к запросу тем read_post_id — отметку пользователя (LEFT JOIN)."""
+    return threads.annotate(
+        user_read_state=FilteredRelation('read_states', condition=Q(read_states__user=user)),
+        read_post_id=F('user_read_state__last_read_post_id'),
+    )
+
+
+def get_floors(user):
+    """{category_id: (max_post_id, max_thread_id)}; раздела без пола нет в словаре."""
+    return {category_id: (post_id, thread_id) for category_id, post_id, thread_id in
+            user.category_read_floors.values_list('category_id', 'max_post_id', 'max_thread_id')}
+
+
+def get_floor(user, category_id):
+    floor = user.category_read_floors.filter(category_id=category_id).values_list(
+        'max_post_id', 'max_thread_id').first()
+    return floor or (0, 0)
+
+
+def set_unread_flags(threads, floor):
+    for thread in threads:
+        thread.is_unread = is_unread(thread.last_post_id, thread.read_post_id, *floor, thread.pk)
+    return threads
+
+
+def unread_counts(user, category_ids):
+    """{category_id: число непрочитанных тем}: полы разделов и один запрос по темам с JOIN отметок."""
+    floors = get_floors(user)
+    # Разделы с одинаковым полом — одно условие (все разделы без пола — (0, 0))
+    by_floor = {}
+    for category_id in category_ids:
+        by_floor.setdefault(floors.get(category_id, (0, 0)), []).append(category_id)
+    if not by_floor:
+        return {}
+
+    # То же, что is_unread, но в SQL: пол своего раздела проверяет база и она же считает темы.
+    # Тема без постов (last_post_id IS NULL) под "last_post_id > ..." не попадает, как и с 0 в is_unread
+    opened = Q(read_post_id__isnull=False, last_post_id__gt=F('read_post_id'))
+    not_opened = Q(read_post_id__isnull=True)
+    condition = Q()
+    for (floor_post_id, floor_thread_id), ids in by_floor.items():
+        condition |= Q(category_id__in=ids) & (
+            (opened & Q(last_post_id__gt=floor_post_id))
+            | (not_opened & (Q(pk__gt=floor_thread_id) | Q(last_post_id__gt=floor_post_id))))
+    rows = (with_read_state(Thread.objects.all(), user)
+            .filter(condition)
+            .order_by()
+            .values('category_id')
+            .annotate(n=Count('pk')))
+    return {row['category_id']: row['n'] for row in rows}
+
+
+def first_unread_post(thread, user):
+    """Первый непрочитанный пост темы (или None, если новых постов нет)."""
+    read_post_id = (ThreadReadState.objects.filter(user=user, thread=thread)
+                    .values_list('last_read_post_id', flat=True).first())
+    floor_post_id, floor_thread_id = get_floor(user, thread.category_id)
+    if read_post_id is None and thread.pk > floor_thread_id:
+        watermark = 0  # Тема целиком новая — читать с начала
+    else:
+        watermark = max(read_post_id or 0, floor_post_id)
+    return thread.posts.filter(pk__gt=watermark).order_by('created_at', 'id').only(
+        'id', 'thread_id', 'created_at').first()
+
+
+def mark_thread_read(user, thread_id, post_id):
+    """Сдвигает отметку вперед одним upsert; назад (при просмотре старой страницы) — никогда."""
+    table = ThreadReadState._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} (user_id, thread_id, last_read_post_id, updated_at) VALUES (%s, %s, %s, %s) '
+            f'ON CONFLICT (user_id, thread_id) DO UPDATE SET '
+            f'last_read_post_id = excluded.last_read_post_id, updated_at = excluded.updated_at '
+            f'WHERE {table}.last_read_post_id < excluded.last_read_post_id',
+            [user.pk, thread_id, post_id, timezone.now()])
+
+
+def current_maxima():
+    return (ThreadPost.objects.aggregate(m=Max('id'))['m'] or 0,
+            Thread.objects.aggregate(m=Max('id'))['m'] or 0)
+
+
+def mark_categories_read(user, category_ids, maxima=None):
+    """Все темы разделов — прочитаны. Отметки по отдельным темам становятся не нужны и удаляются."""
+    max_post_id, max_thread_id = maxima or current_maxima()
+    CategoryReadFloor.objects.bulk_create(
+        [CategoryReadFloor(user=user, category_id=category_id, max_post_id=max_post_id, max_thread_id=max_thread_id)
+         for category_id in category_ids],
+        update_conflicts=True, unique_fields=['user', 'category'],
+        update_fields=['max_post_id', 'max_thread_id', 'updated_at'],
+    )
+    ThreadReadState.objects.filter(user=user, thread__category_id__in=category_ids,
+                                   last_read_post_id__lte=max_post_id).delete()
@@ -9,12 +9,20 @@ urlpatterns = [
     path('forum/', views.forum_index, name='forum_index'),
     path('forum/cat/<int:pk>/', views.category_detail, name='category_detail'),
     path('forum/cat/<int:pk>/create/', views.create_thread, name='create_thread'),
+    path('forum/cat/<int:pk>/read/', views.mark_read, name='mark_category_read'),
+    path('forum/read/', views.mark_read, name='mark_forum_read'),
     path('forum/thread/<int:pk>/', views.thread_detail, name='thread_detail'),
+    path('forum/post/<int:pk>/', views.post_permalink, name='post_permalink'),
 
     path('chat/get/', views.chat_get_messages, name='chat_get'),
     path('chat/send/', views.chat_send_message, name='chat_send'),
+    path('chat/stream/', views.chat_stream, name='chat_stream'),
+
+    path('search/', views.search, name='search'),
+    path('api/search/', views.search_api, name='search_api'),
 
     path('rules/', views.rules, name='rules'),
 
     path('reaction/<str:model_type>/<int:pk>/<str:value>/', views.add_reaction, name='add_reaction'),
+    path('api/reaction/<str:model_type>/<int:pk>/<str:value>/', views.reaction_api, name='reaction_api'),
 ]
\ No newline at end of file
@@ -1,27 +1,54 @@
 from django.shortcuts import render, get_object_or_404, redirect
+from django.urls import reverse
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
 from django.contrib.auth.decorators import login_required
-from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import PermissionDenied
 from django.http import HttpResponseForbidden
-from .models import News, NewsComment, Category, Thread, ThreadPost, Reaction, ChatMessage
+from .models import News, NewsComment, Category, Thread, ThreadPost, ChatMessage
 from .forms import NewsForm, NewsCommentForm, ThreadForm, PostForm
-from django.http import JsonResponse
+from .reactions import REACTION_TARGETS, toggle_reaction, load_reactions
+from .comments import build_comment_tree
+from .caching import cache_anonymous_page, cached_fragment
+from .pagination import KeysetPaginator, page_cache_key
+from .ratelimit import is_repeat, rate_limit
+from .search import SEARCH_RESULTS_PER_PAGE, search as search_documents
+from .unread import (first_unread_post, get_floor, mark_categories_read, mark_thread_read, set_unread_flags,
+                     unread_counts, with_read_state)
+from .models import SearchDocument
+from django.core.paginator import Paginator
+from .chat import (CHAT_WINDOW, get_broadcaster, get_chat_window, get_latest_marker, serialize_message,
+                   set_latest_marker)
+from django.conf import settings
+from project.db.routing import use_replica
+from apps.users.permissions import can_create_news, can_interact, can_post, can_reply
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import condition, require_POST
+from django.views.decorators.vary import vary_on_cookie
+from asgiref.sync import sync_to_async
+from datetime import timedelta
+import asyncio
 import json
 
-
-# Хелперы прав доступа
-def can_create_news(user):
-    return user.is_authenticated and (user.is_superuser or user.groups.filter(name='Moderators').exists())
-
-
-def can_interact(user):
-    return user.is_authenticated and not user.is_banned
+NEWS_PER_PAGE = 10
+THREADS_PER_PAGE = 30
+POSTS_PER_PAGE = 20
 
 
 # === ГЛАВНАЯ (НОВОСТИ) ===
+@use_replica
+@cache_anonymous_page(lambda request: ['news'])
 def home(request):
-    news_list = News.objects.all().order_by('-created_at')
-    return render(request, 'home.html', {'news_list': news_list, 'can_create_news': can_create_news(request.user)})
+    # Полный текст в ленте не нужен — показываем готовый анонс
+    page = KeysetPaginator(News.objects.select_related('author').defer('content'), NEWS_PER_PAGE,
+                           descending=True).page_from_request(request)
+    load_reactions(page.object_list, request.user)
+    return render(request, 'home.html', {
+        'news_list': page.object_list,
+        'page': page,
+        'can_create_news': can_create_news(request.user)
+    })
 
 
 @login_required
@@ -40,14 +67,13 @@ def create_news(request):
     return render(request, 'forum/create_news.html', {'form': form})
 
 
+@use_replica
+@cache_anonymous_page(lambda request, pk: [f'news:{pk}'])
+@rate_limit('comment')
 def news_detail(request, pk):
-    news = get_object_or_404(News, pk=pk)
+    news = get_object_or_404(News.objects.select_related('author'), pk=pk)
     form = NewsCommentForm()
 
-    # Сортировка и получение только корневых комментариев (у которых нет родителя)
-    # Дочерние мы будем доставать в шаблоне через .replies.all
-    root_comments = news.comments.filter(parent__isnull=True).order_by('-created_at')
-
     if request.method == 'POST':
         if not can_interact(request.user):
             return HttpResponseForbidden("Вы забанены или не авторизованы")
@@ -61,26 +87,49 @@ def news_detail(request, pk):
             parent_id = request.POST.get('parent_id')
             if parent_id:
                 try:
-                    parent_comment = NewsComment.objects.get(id=parent_id)
+                    parent_comment = news.comments.get(id=parent_id)
                     comment.parent = parent_comment
-                except NewsComment.DoesNotExist:
+                except (NewsComment.DoesNotExist, ValueError):
                     pass
 
             comment.save()
             return redirect('news_detail', pk=pk)
 
+    # Все комментарии новости одним запросом, дерево собираем в Python.
+    # ?comment=<id> — показать только ветку этого комментария ("Продолжить ветку")
+    # Сами комментарии общие для всех и берутся из кеша, реакции пользователя — поверх
+    comments = cached_fragment(f'comments:{pk}', [f'news:{pk}'],
+                               lambda: list(news.comments.select_related('author').order_by('created_at', 'id')))
+    load_reactions([news] + comments, request.user)
+    focus_id = request.GET.get('comment')
+    focus_id = int(focus_id) if focus_id and focus_id.isdigit() else None
+    root_comments = build_comment_tree(comments, root_id=focus_id)
+
     return render(request, 'forum/news_detail.html', {
         'news': news,
-        'comments': root_comments,  # Передаем только корневые
+        'comments': root_comments,  # Корни дерева, ответы лежат в .children
+        'focus_id': focus_id,
         'form': form,
         'can_interact': can_interact(request.user)
     })
 
 
 # === ФОРУМ ===
+@use_replica
+@cache_anonymous_page(lambda request: ['forum'])
 def forum_index(request):
-    admin_categories = Category.objects.filter(is_admin_only=True)
-    general_categories = Category.objects.filter(is_admin_only=False)
+    # Один запрос: счетчики и последняя активность лежат в самой строке Category
+    categories = (Category.objects
+                  .select_related('last_activity_thread', 'last_activity_author')
+                  .defer('last_activity_thread__content')
+                  .order_by('pk'))
+    if request.user.is_authenticated:
+        # Число тем с новыми сообщениями в каждом разделе
+        counts = unread_counts(request.user, [c.pk for c in categories])
+        for category in categories:
+            category.unread_count = counts.get(category.pk, 0)
+    admin_categories = [c for c in categories if c.is_admin_only]
+    general_categories = [c for c in categories if not c.is_admin_only]
 
     context = {
         'admin_categories': admin_categories,
@@ -89,41 +138,30 @@ def forum_index(request):
     return render(request, 'forum/index.html', context)
 
 
+@use_replica
+@cache_anonymous_page(lambda request, pk: [f'category:{pk}'])
 def category_detail(request, pk):
     category = get_object_or_404(Category, pk=pk)
-    threads = category.threads.all().order_by('-created_at')
-
-    # Логика прав на создание темы
-    can_post = False
-    if request.user.is_authenticated and not request.user.is_banned:
-        if category.is_admin_only:
-            # Если раздел админский
-            if category.is_feedback:
-                can_post = True  # В "Связь с адм" могут писать все
-            elif request.user.is_superuser or request.user.groups.filter(name='Moderators').exists():
-                can_post = True  # Иначе только модеры
-        else:
-            can_post = True  # Обычный раздел
+    queryset = category.threads.select_related('author', 'last_post_author').defer('content', 'excerpt')
+    if request.user.is_authenticated:
+        queryset = with_read_state(queryset, request.user)
+    # Сверху темы с самым свежим ответом — по индексу (category, last_post_at, id)
+    paginator = KeysetPaginator(queryset, THREADS_PER_PAGE, keys=('last_post_at', 'id'), descending=True)
+    threads = paginator.page_from_request(request)
+    if request.user.is_authenticated:
+        set_unread_flags(threads.object_list, get_floor(request.user, category.pk))
 
     return render(request, 'forum/category_detail.html',
-                  {'category': category, 'threads': threads, 'can_post': can_post})
+                  {'category': category, 'threads': threads, 'can_post': can_post(request.user, category)})
 
 
 @login_required
+@rate_limit('thread')
 def create_thread(request, pk):
     category = get_object_or_404(Category, pk=pk)
 
-    # Проверка прав (дубль логики для безопасности)
-    allowed = False
-    if not request.user.is_banned:
-        if category.is_admin_only:
-            if category.is_feedback or request.user.is_superuser or request.user.groups.filter(
-                    name='Moderators').exists():
-                allowed = True
-        else:
-            allowed = True
-
-    if not allowed:
+    # Проверка прав (та же, что и для кнопки на странице раздела)
+    if not can_post(request.user, category):
         raise PermissionDenied
 
     if request.method == 'POST':
@@ -132,34 +170,53 @@ def create_thread(request, pk):
             thread = form.save(commit=False)
             thread.category = category
             thread.author = request.user
-            thread.save()
+            with transaction.atomic():
+                thread.save()
+                category.register_activity(thread, request.user, thread.created_at, new_threads=1)
             return redirect('category_detail', pk=pk)
     else:
         form = ThreadForm()
     return render(request, 'forum/create_thread.html', {'form': form, 'category': category})
 
 
+@login_required
+@require_POST
+def mark_read(request, pk=None):
+    # Отметить прочитанным один раздел или (без pk) весь форум
+    if pk is not None:
+        category = get_object_or_404(Category, pk=pk)
+        mark_categories_read(request.user, [category.pk])
+        return redirect('category_detail', pk=pk)
+    mark_categories_read(request.user, list(Category.objects.values_list('pk', flat=True)))
+    return redirect('forum_index')
+
+
+@use_replica
+@cache_anonymous_page(lambda request, pk: [f'thread:{pk}'])
+@rate_limit('post')
 def thread_detail(request, pk):
-    thread = get_object_or_404(Thread, pk=pk)
-
-    # ИЗМЕНЕНИЕ: Берем ВСЕ посты по порядку (линейный вид), а не дерево
-    posts = thread.posts.all().order_by('created_at')
+    threads = Thread.objects.select_related('category', 'author')
+    if request.user.is_authenticated:
+        threads = with_read_state(threads, request.user)
+    thread = get_object_or_404(threads, pk=pk)
+
+    if 'unread' in request.GET and request.user.is_authenticated:
+        # Переход к первому непрочитанному посту (ссылка из списка тем)
+        post = first_unread_post(thread, request.user)
+        if post is None:
+            return redirect(reverse('thread_detail', args=[pk]) + '?last')
+        cursor = KeysetPaginator(ThreadPost.objects.all(), POSTS_PER_PAGE).encode_cursor(post)
+        return redirect(reverse('thread_detail', args=[pk]) + f'?at={cursor}#post-{post.pk}')
+
+    # Посты по порядку (линейный вид), постранично по курсору (created_at, id)
+    paginator = KeysetPaginator(thread.posts.select_related('author'), POSTS_PER_PAGE)
 
     form = PostForm()
 
-    # Логика прав (без изменений)
-    can_reply = False
-    if request.user.is_authenticated and not request.user.is_banned:
-        if thread.category.is_admin_only:
-            if thread.category.is_feedback:
-                can_reply = True
-            elif request.user.is_superuser or request.user.groups.filter(name='Moderators').exists():
-                can_reply = True
-        else:
-            can_reply = True
+    user_can_reply = can_reply(request.user, thread)
 
     if request.method == 'POST':
-        if not can_reply:
+        if not user_can_reply:
             return HttpResponseForbidden()
         form = PostForm(request.POST)
         if form.is_valid():
@@ -167,79 +224,232 @@ def thread_detail(request, pk):
             post.thread = thread
             post.author = request.user
             # Parent ID для форума больше не используем (линейная структура)
-            post.save()
-            return redirect('thread_detail', pk=pk)
+            with transaction.atomic():
+                post.save()
+                thread.register_reply(post)
+                thread.category.register_activity(thread, request.user, post.created_at, new_posts=1)
+            # Новый пост всегда на последней странице
+            return redirect(reverse('thread_detail', args=[pk]) + f'?last#post-{post.pk}')
+
+    # Страница постов общая для всех и берется из кеша, реакции пользователя — поверх
+    page = cached_fragment(f'posts:{pk}:{page_cache_key(request)}', [f'thread:{pk}'],
+                           lambda: paginator.page_from_request(request))
+    load_reactions([thread] + page.object_list, request.user)
+
+    if request.user.is_authenticated:
+        # Сдвигаем отметку прочтения до последнего поста на странице, только если она выросла
+        read_up_to = max((post.pk for post in page.object_list), default=0)
+        if thread.read_post_id is None or read_up_to > thread.read_post_id:
+            mark_thread_read(request.user, thread.pk, read_up_to)
 
     return render(request, 'forum/thread_detail.html', {
         'thread': thread,
-        'posts': posts,
+        'posts': page.object_list,
+        'page': page,
         'form': form,
-        'can_reply': can_reply
+        'can_reply': user_can_reply
+    })
+
+
+def post_permalink(request, pk):
+    # Постоянная ссылка на пост: открываем страницу темы, которая начинается с этого поста
+    post = get_object_or_404(ThreadPost.objects.only('id', 'thread_id', 'created_at'), pk=pk)
+    cursor = KeysetPaginator(ThreadPost.objects.all(), POSTS_PER_PAGE).encode_cursor(post)
+    return redirect(reverse('thread_detail', args=[post.thread_id]) + f'?at={cursor}#post-{post.pk}')
+
+
+# === ПОИСК ===
+def _search_page(request):
+    query = request.GET.get('q', '').strip()
+    kinds = request.GET.getlist('type')
+    results = search_documents(query, kinds)
+    page = Paginator(results, SEARCH_RESULTS_PER_PAGE).get_page(request.GET.get('page'))
+    return results, page
+
+
+def search(request):
+    results, page = _search_page(request)
+    params = request.GET.copy()
+    params.pop('page', None)
+    return render(request, 'forum/search.html', {
+        'query': results.query,
+        'kinds': SearchDocument.KINDS,
+        'selected_kinds': results.kinds,
+        'page': page,
+        'params': params.urlencode(),  # Для ссылок на другие страницы выдачи
+    })
+
+
+def search_api(request):
+    results, page = _search_page(request)
+    return JsonResponse({
+        'query': results.query,
+        'count': page.paginator.count,
+        'page': page.number,
+        'num_pages': page.paginator.num_pages,
+        'results': [hit.as_dict() for hit in page.object_list],
     })
 
 
 # === РЕАКЦИИ ===
+def _reaction_target(request, model_type, pk, value):
+    """Объект и значение реакции из URL или None, если реагировать нельзя."""
+    model = REACTION_TARGETS.get(model_type)
+    if value not in ('1', '-1') or model is None or not can_interact(request.user):
+        return None, None
+    return get_object_or_404(model, pk=pk), int(value)
+
+
 @login_required
+@rate_limit('reaction', methods=('GET', 'POST'))
 def add_reaction(request, model_type, pk, value):
-    value = int(value)
-
-    if request.user.is_banned:
+    obj, value = _reaction_target(request, model_type, pk, value)
+    if obj is None:
         return HttpResponseForbidden()
+    toggle_reaction(request.user, obj, value)
 
-    # Определение модели по строке
-    model_map = {
-        'news': News,
-        'news_comment': NewsComment,
-        'thread': Thread,
-        'post': ThreadPost
-    }
-    model = model_map.get(model_type)
-    if not model:
-        return HttpResponseForbidden()
+    return redirect(request.META.get('HTTP_REFERER', '/'))
 
-    obj = get_object_or_404(model, pk=pk)
-    ct = ContentType.objects.get_for_model(obj)
-
-    # Удалить старую реакцию если есть, или обновить
-    reaction, created = Reaction.objects.get_or_create(
-        user=request.user,
-        content_type=ct,
-        object_id=obj.id,
-        defaults={'value': value}
-    )
-    if not created:
-        if reaction.value == value:
-            reaction.delete()  # Тоггл (убрать лайк)
-        else:
-            reaction.value = value
-            reaction.save()
 
-    return redirect(request.META.get('HTTP_REFERER', '/'))
+@require_POST
+@rate_limit('reaction', json=True)
+def reaction_api(request, model_type, pk, value):
+    # То же, что add_reaction, но без перезагрузки страницы: отдает новые счетчики
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'auth'}, status=403)
+    obj, value = _reaction_target(request, model_type, pk, value)
+    if obj is None:
+        return JsonResponse({'error': 'forbidden'}, status=403)
+    state = toggle_reaction(request.user, obj, value)
+    return JsonResponse({'likes': obj.likes_count, 'dislikes': obj.dislikes_count, 'state': state})
 
 
 # === ЧАТ ===
+def _chat_etag(request):
+    return f'"chat-{get_latest_marker()[0]}"'
+
+
+def _chat_last_modified(request):
+    return get_latest_marker()[1]
+
+
+# ETag/Last-Modified берутся из маркера в кеше: если новых сообщений нет,
+# condition() отвечает 304 еще до запроса к БД
+@use_replica
+@condition(etag_func=_chat_etag, last_modified_func=_chat_last_modified)
+@vary_on_cookie
 def chat_get_messages(request):
-    # Берем последние 50 сообщений
-    messages = ChatMessage.objects.select_related('author').order_by('-created_at')[:50]
-    results = []
-    for msg in reversed(messages): # Разворачиваем, чтобы старые были сверху
-        results.append({
-            'author': msg.author.username,
-            'avatar': msg.author.avatar.url if msg.author.avatar else None,
-            'content': msg.content,
-            'created_at': msg.created_at.strftime("%H:%M"),
-            'is_me': request.user.is_authenticated and msg.author == request.user
-        })
-    return JsonResponse({'messages': results})
+    # Окно последних сообщений общее для всех и лежит в кеше уже сериализованным.
+    # Личное только "me" — id текущего пользователя, свои сообщения клиент
+    # определяет сам, сравнивая его с author_id
+    latest_id = get_latest_marker()[0]
+    after_id = request.GET.get('after_id')
+    me = json.dumps(request.user.id if request.user.is_authenticated else None)
+
+    if after_id and after_id.isdigit():
+        # Только сообщения новее after_id
+        after_id = int(after_id)
+        messages = [] if after_id >= latest_id else [m for m in get_chat_window(latest_id)[0] if m['id'] > after_id]
+        body = '{"me": %s, "messages": %s}' % (me, json.dumps(messages))
+    else:
+        body = '{"me": %s, "messages": %s}' % (me, get_chat_window(latest_id)[1])
+
+    response = HttpResponse(body, content_type='application/json')
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+async def _chat_messages_after(last_id, limit=CHAT_WINDOW, seen=None):
+    """Сообщения новее last_id по возрастанию id; при last_id=None — последние limit.
+
+    seen — {id: created_at} уже отданных потоку сообщений. С ним берутся еще и
+    неотданные сообщения моложе CHAT_STREAM_LOOKBACK_SECONDS: id выдается при
+    вставке, а коммит может прийти позже коммита следующего id (другой воркер,
+    параллельные запросы), и "id > last_id" такое сообщение уже не найдет.
+    """
+    qs = ChatMessage.objects.select_related('author')
+    if last_id is None:
+        # Первое подключение — последние сообщения окна, старые сверху
+        messages = [msg async for msg in qs.order_by('-id')[:limit]]
+        messages.reverse()
+    elif seen is None:
+        messages = [msg async for msg in qs.filter(id__gt=last_id).order_by('id')[:limit]]
+    else:
+        since = timezone.now() - timedelta(seconds=settings.CHAT_STREAM_LOOKBACK_SECONDS)
+        for message_id, created_at in list(seen.items()):
+            if created_at < since:
+                del seen[message_id]
+        messages = [msg async for msg in qs.filter(Q(id__gt=last_id) | Q(created_at__gte=since))
+                    .exclude(id__in=list(seen)).order_by('id')[:limit]]
+    if seen is not None:
+        seen.update((msg.id, msg.created_at) for msg in messages)
+    # Поток живет до часа, а в БД ходит только при новых сообщениях и раз в
+    # CHAT_STREAM_RESYNC_SECONDS: соединение
+    # отдаем сразу (с пулом — обратно в пул), а не держим до request_finished
+    await sync_to_async(close_old_connections)()
+    return [serialize_message(msg) for msg in messages]
+
+
+def _sse_event(message, event_id):
+    # id события — наибольший отданный id: с него браузер продолжит после обрыва
+    return f"id: {event_id}\nevent: message\ndata: {json.dumps(message)}\n\n"
+
+
+async def _chat_event_stream(last_id):
+    broadcaster = get_broadcaster()
+    subscription = broadcaster.subscribe()
+    resync = settings.CHAT_STREAM_RESYNC_SECONDS
+    seen = {}
+    try:
+        yield f"retry: {resync * 1000}\n\n"
+        while True:
+            # Сообщения всегда читаем из БД, публикация в процессе — только сигнал проснуться.
+            # Так поток видит и сообщения других воркеров, и закоммиченные не по порядку id
+            while True:
+                messages = await _chat_messages_after(last_id, seen=seen)
+                for message in messages:
+                    last_id = max(last_id or 0, message['id'])
+                    yield _sse_event(message, last_id)
+                last_id = last_id or 0
+                if len(messages) < CHAT_WINDOW:
+                    break
+            try:
+                await subscription.get(timeout=resync)
+                subscription.drain()
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+    finally:
+        broadcaster.unsubscribe(subscription)
+
+
+async def chat_stream(request):
+    # Server-Sent Events: клиент получает только новые сообщения.
+    # При переподключении браузер сам шлет Last-Event-ID, вручную можно передать ?since=<id>
+    since = request.headers.get('Last-Event-ID') or request.GET.get('since')
+    last_id = int(since) if since and since.isdigit() else None
+
+    response = StreamingHttpResponse(_chat_event_stream(last_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Nginx не должен буферизовать поток
+    return response
 
 @login_required
+@rate_limit('chat', json=True)
 def chat_send_message(request):
-    if request.method == 'POST' and not request.user.is_banned:
+    if request.method == 'POST' and can_interact(request.user):
         data = json.loads(request.body)
         content = data.get('message', '').strip()
+        if content and is_repeat(f'chat:{request.user.pk}', content, settings.CHAT_REPEAT_SECONDS):
+            return JsonResponse({'status': 'error', 'error': 'repeat',
+                                 'message': "Такое сообщение уже отправлено"}, status=400)
         if content:
-            ChatMessage.objects.create(author=request.user, content=content)
-            return JsonResponse({'status': 'ok'})
+            msg = ChatMessage.objects.create(author=request.user, content=content)
+            def on_commit():
+                set_latest_marker(msg)
+                get_broadcaster().publish(serialize_message(msg))
+
+            transaction.on_commit(on_commit)
+            return JsonResponse({'status': 'ok', 'id': msg.id})
     return JsonResponse({'status': 'error'}, status=400)
 
 def rules(request):
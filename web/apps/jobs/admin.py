@@ -0,0 +1,29 @@
+from django.contrib import admin
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'created_at', 'run_at', 'finished_at', 'locked_by')
+    list_filter = ('status', 'name')
+    search_fields = ('dedupe_key',)
+    readonly_fields = ('created_at', 'started_at', 'finished_at', 'locked_by', 'last_error')
+    actions = ['retry']
+
+    @admin.action(description="Повторить (поставить в очередь заново)")
+    def retry(self, request, queryset):
+        # Ждущие и выполняемые не трогаем. По одной: задача, у которой в очереди
+        # уже есть двойник с тем же dedupe_key, пропускается
+        retried = 0
+        for job in queryset.filter(status__in=[Job.FAILED, Job.DONE]):
+            job.status, job.run_at, job.attempts, job.finished_at = Job.QUEUED, timezone.now(), 0, None
+            try:
+                with transaction.atomic():
+                    job.save(update_fields=['status', 'run_at', 'attempts', 'finished_at'])
+            except IntegrityError:
+                continue
+            retried += 1
+        self.message_user(request, f"Поставлено в очередь: {retried}")
@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class JobsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.jobs'
+    label = 'jobs'
+
+    def ready(self):
+        # Задачи объявляются в модулях tasks.py приложений (декоратор @job)
+        autodiscover_modules('tasks')
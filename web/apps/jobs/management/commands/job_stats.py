@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from apps.jobs.queue import queue_stats
+
+
+def _seconds(value):
+    return '-' if value is None else f'{value:.1f}'
+
+
+class Command(BaseCommand):
+    help = ("Состояние очереди фоновых задач: сколько ждет, выполняется и упало, "
+            "возраст самой старой готовой задачи и задержки выполненных")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=1, help="За сколько часов считать задержки выполненных")
+
+    def handle(self, *args, hours, **options):
+        stats = queue_stats(hours)
+        if not stats:
+            self.stdout.write("Очередь пуста")
+            return
+        self.stdout.write(f"{'задача':<28} {'готово':>7} {'отлож.':>7} {'идет':>5} {'ошибки':>7} "
+                          f"{'старшая,с':>10} {'готово за ' + str(hours) + 'ч':>12} "
+                          f"{'ожид.p50':>9} {'ожид.p95':>9} {'вып.p95':>8}")
+        for name, row in sorted(stats.items()):
+            self.stdout.write(f"{name:<28} {row['ready']:>7} {row['delayed']:>7} {row['running']:>5} "
+                              f"{row['failed']:>7} {_seconds(row['oldest_wait']):>10} {row.get('done', 0):>12} "
+                              f"{_seconds(row.get('wait_p50')):>9} {_seconds(row.get('wait_p95')):>9} "
+                              f"{_seconds(row.get('run_p95')):>8}")
@@ -0,0 +1,92 @@
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections, connection, connections
+
+from apps.jobs.queue import claim, prune_finished, requeue_stale, run_job
+
+logger = logging.getLogger('apps.jobs')
+
+# Как часто главный поток перезапускает зависшие задачи и чистит выполненные
+HOUSEKEEPING_SECONDS = 60
+
+
+class Command(BaseCommand):
+    help = ("Воркер фоновых задач: забирает задачи из таблицы jobs_job и выполняет их "
+            "в нескольких потоках. Останавливается по SIGTERM/SIGINT, доделав текущие задачи")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=settings.JOBS_CONCURRENCY,
+                            help="Число потоков (по умолчанию JOBS_CONCURRENCY)")
+        parser.add_argument('--poll', type=float, default=settings.JOBS_POLL_SECONDS,
+                            help="Пауза при пустой очереди, секунды")
+        parser.add_argument('--once', action='store_true', help="Выполнить все готовые задачи и выйти")
+
+    def _work(self, number, poll, once):
+        worker = f'{socket.gethostname()}:{os.getpid()}:{number}'
+        try:
+            while not self.stopping.is_set():
+                close_old_connections()
+                try:
+                    jobs = claim(worker)
+                except DatabaseError:
+                    # БД недоступна или занята — поток не умирает, пробуем позже
+                    logger.exception("Воркер %s: не удалось взять задачу", worker)
+                    self.stopping.wait(poll)
+                    continue
+                if not jobs:
+                    if once:
+                        return
+                    self.stopping.wait(poll)
+                    continue
+                for job in jobs:
+                    ok = run_job(job)
+                    with self.lock:
+                        self.counts[ok] += 1
+        finally:
+            connections.close_all()
+
+    def _stop(self, signum, frame):
+        self.stdout.write("Останавливаемся после текущих задач...")
+        self.stopping.set()
+
+    def _housekeeping(self):
+        stale = requeue_stale(settings.JOBS_TIMEOUT)
+        pruned = prune_finished(settings.JOBS_KEEP_DONE_HOURS)
+        if stale or pruned:
+            self.stdout.write(f"Перезапущено зависших: {stale}, удалено выполненных: {pruned}")
+
+    def handle(self, *args, concurrency, poll, once, **options):
+        if connection.vendor == 'sqlite' and concurrency > 1:
+            # Транзакции SQLite, начатые с чтения, при параллельной записи сразу падают с "database is locked"
+            self.stdout.write("SQLite: задачи выполняются в один поток")
+            concurrency = 1
+        self.stopping = threading.Event()
+        self.lock = threading.Lock()
+        self.counts = {True: 0, False: 0}
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        self._housekeeping()
+        threads = [threading.Thread(target=self._work, args=(number, poll, once), daemon=True)
+                   for number in range(max(1, concurrency))]
+        for thread in threads:
+            thread.start()
+        self.stdout.write(f"Воркер запущен, потоков: {len(threads)}")
+
+        last_housekeeping = time.monotonic()
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=1)
+            if time.monotonic() - last_housekeeping > HOUSEKEEPING_SECONDS:
+                close_old_connections()
+                self._housekeeping()
+                last_housekeeping = time.monotonic()
+        connections.close_all()
+        self.stdout.write(f"Выполнено: {self.counts[True]}, с ошибкой: {self.counts[False]}")
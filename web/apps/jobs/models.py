@@ -0,0 +1,46 @@
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """Фоновая задача. Очередь — сама таблица, воркер — команда run_jobs."""
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    ]
+
+    name = models.CharField(max_length=100)  # Имя из реестра @job
+    args = models.JSONField(default=dict, blank=True)  # Именованные аргументы функции
+    # Пока в очереди ждет задача с таким ключом, вторая такая же не ставится
+    dedupe_key = models.CharField(max_length=200, blank=True, default='')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    created_at = models.DateTimeField(default=timezone.now)
+    run_at = models.DateTimeField(default=timezone.now)  # Не раньше (отложенный запуск и повторы)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True, default='')
+    last_error = models.TextField(blank=True, default='')
+
+    class Meta:
+        indexes = [
+            # Выборка воркером: только ждущие задачи, по времени запуска
+            models.Index(fields=['run_at', 'id'], condition=Q(status='queued'), name='jobs_ready_idx'),
+            models.Index(fields=['status', 'finished_at'], name='jobs_status_finished_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['dedupe_key'], condition=Q(status='queued') & ~Q(dedupe_key=''),
+                                    name='jobs_queued_dedupe_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.get_status_display()})"
@@ -0,0 +1,184 @@
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Min, Q, Subquery
+from django.utils import timezone
+
+from .models import Job
+
+# Очередь фоновых задач в основной БД. Воркер (manage.py run_jobs) забирает
+# задачи одним UPDATE ... WHERE id IN (SELECT ... FOR UPDATE SKIP LOCKED):
+# несколько воркеров не ждут друг друга и не берут одну задачу дважды.
+# На SQLite блокировок строк нет, но UPDATE и так выполняется под блокировкой
+# записи всей БД.
+
+logger = logging.getLogger('apps.jobs')
+
+_registry = {}
+
+
+def job(name):
+    """Декоратор: регистрирует функцию как задачу name. Аргументы — только то, что ложится в JSON."""
+    def decorator(func):
+        _registry[name] = func
+        return func
+    return decorator
+
+
+def _build(name, args, dedupe_key, delay, max_attempts):
+    if name not in _registry:
+        raise LookupError(f"Неизвестная задача: {name}")
+    now = timezone.now()
+    return Job(name=name, args=args or {}, dedupe_key=dedupe_key, created_at=now,
+               run_at=now + timedelta(seconds=delay),
+               max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS)
+
+
+def enqueue(name, args=None, dedupe_key='', delay=0, max_attempts=None):
+    """Ставит задачу в очередь сразу, в текущей транзакции.
+
+    Если в очереди уже ждет задача с тем же dedupe_key, новая не ставится.
+    """
+    job = _build(name, args, dedupe_key, delay, max_attempts)
+    if settings.JOBS_RUN_INLINE:
+        _run_inline(name, job.args)
+        return
+    # Дубликат по dedupe_key отсекает условный уникальный индекс
+    Job.objects.bulk_create([job], ignore_conflicts=True)
+
+
+def _run_inline(name, args):
+    # Как в run_job: задача в своей транзакции (при вызове внутри чужой — точка сохранения),
+    # ошибка только в лог. Из on_commit она иначе дошла бы до пользователя 500-й после
+    # того, как его данные уже сохранены
+    try:
+        with transaction.atomic():
+            _registry[name](**args)
+    except Exception:
+        logger.exception("Задача %s (без очереди): ошибка", name)
+
+
+def enqueue_on_commit(name, args=None, dedupe_key='', delay=0, max_attempts=None):
+    """Ставит задачу после коммита текущей транзакции: воркер не увидит данных, которых еще нет."""
+    # Проверяем имя сразу, чтобы опечатка упала во вьюхе, а не после коммита
+    _build(name, args, dedupe_key, delay, max_attempts)
+    transaction.on_commit(lambda: enqueue(name, args, dedupe_key, delay, max_attempts))
+
+
+# --- воркер ---
+def claim(worker, limit=1):
+    """Забирает до limit готовых задач и помечает их выполняемыми воркером worker."""
+    now = timezone.now()
+    ready = (Job.objects.select_for_update(skip_locked=True)
+             .filter(status=Job.QUEUED, run_at__lte=now).order_by('run_at', 'id').values('id')[:limit])
+    with transaction.atomic():
+        claimed = Job.objects.filter(id__in=Subquery(ready)).update(
+            status=Job.RUNNING, locked_by=worker, started_at=now, attempts=F('attempts') + 1)
+    if not claimed:
+        return []
+    # Других выполняемых задач у воркера нет: прошлые он завершил перед тем, как брать новые
+    return list(Job.objects.filter(status=Job.RUNNING, locked_by=worker))
+
+
+def retry_delay(attempts):
+    """Экспоненциальная пауза перед повтором (секунды) со случайным разбросом."""
+    delay = min(settings.JOBS_RETRY_MAX_DELAY, settings.JOBS_RETRY_BASE_DELAY * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1)
+
+
+def _owned(job):
+    # Условие на воркера: задачу, которую уже перезапустил requeue_stale, не трогаем
+    return Job.objects.filter(pk=job.pk, status=Job.RUNNING, locked_by=job.locked_by)
+
+
+def _fail(job, error):
+    now = timezone.now()
+    if job.attempts < job.max_attempts:
+        try:
+            with transaction.atomic():
+                _owned(job).update(
+                    status=Job.QUEUED, run_at=now + timedelta(seconds=retry_delay(job.attempts)),
+                    locked_by='', last_error=error)
+            return
+        except IntegrityError:
+            # Пока задача выполнялась, такую же поставили заново — повтор сделает она
+            error += "\nПовтор не поставлен: в очереди уже есть задача с тем же ключом"
+    _owned(job).update(status=Job.FAILED, finished_at=now, locked_by='', last_error=error)
+
+
+def run_job(job):
+    """Выполняет задачу в транзакции и записывает результат. True — успешно."""
+    started = timezone.now()
+    try:
+        func = _registry.get(job.name)
+        if func is None:
+            raise LookupError(f"Неизвестная задача: {job.name}")
+        with transaction.atomic():
+            func(**job.args)
+    except Exception:
+        logger.exception("Задача %s #%s, попытка %s/%s: ошибка", job.name, job.pk, job.attempts, job.max_attempts)
+        _fail(job, traceback.format_exc(limit=20))
+        return False
+
+    finished = timezone.now()
+    _owned(job).update(status=Job.DONE, finished_at=finished, locked_by='')
+    logger.info("Задача %s #%s: ожидание %.0f мс, выполнение %.0f мс", job.name, job.pk,
+                (started - job.run_at).total_seconds() * 1000, (finished - started).total_seconds() * 1000)
+    return True
+
+
+def requeue_stale(timeout):
+    """Задачи, которые выполняются дольше timeout секунд (воркер упал), считаются неудачной попыткой."""
+    stale = Job.objects.filter(status=Job.RUNNING, started_at__lt=timezone.now() - timedelta(seconds=timeout))
+    count = 0
+    for job in stale:
+        _fail(job, f"Воркер {job.locked_by} не завершил задачу за {timeout} с")
+        count += 1
+    return count
+
+
+def prune_finished(hours):
+    """Удаляет выполненные задачи старше hours часов. Ошибки остаются для разбора в админке."""
+    deleted, _ = Job.objects.filter(status=Job.DONE, finished_at__lt=timezone.now() - timedelta(hours=hours)).delete()
+    return deleted
+
+
+# --- наблюдение ---
+def _percentile(values, share):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def queue_stats(window_hours=1):
+    """Показатели по именам задач: глубина очереди сейчас и задержки выполненных за window_hours часов."""
+    now = timezone.now()
+    stats = {}
+    rows = (Job.objects.exclude(status=Job.DONE).values('name')
+            .annotate(ready=Count('id', filter=Q(status=Job.QUEUED, run_at__lte=now)),
+                      delayed=Count('id', filter=Q(status=Job.QUEUED, run_at__gt=now)),
+                      running=Count('id', filter=Q(status=Job.RUNNING)),
+                      failed=Count('id', filter=Q(status=Job.FAILED)),
+                      oldest=Min('run_at', filter=Q(status=Job.QUEUED, run_at__lte=now))))
+    for row in rows:
+        name, oldest = row.pop('name'), row.pop('oldest')
+        row['oldest_wait'] = (now - oldest).total_seconds() if oldest else 0
+        stats[name] = row
+
+    # Задержки считаем по выполненным задачам: ожидание — от run_at до старта, выполнение — до финиша
+    finished = (Job.objects.filter(status=Job.DONE, finished_at__gte=now - timedelta(hours=window_hours))
+                .values_list('name', 'run_at', 'started_at', 'finished_at'))
+    waits, runs = {}, {}
+    for name, run_at, started_at, finished_at in finished.iterator():
+        waits.setdefault(name, []).append((started_at - run_at).total_seconds())
+        runs.setdefault(name, []).append((finished_at - started_at).total_seconds())
+    for name in waits:
+        row = stats.setdefault(name, dict(ready=0, delayed=0, running=0, failed=0, oldest_wait=0))
+        row.update(done=len(waits[name]), wait_p50=_percentile(waits[name], 0.5),
+                   wait_p95=_percentile(waits[name], 0.95), run_p95=_percentile(runs[name], 0.95))
+    return stats
@@ -0,0 +1,29 @@
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.test import TestCase, override_settings
+
+from apps.jobs.queue import enqueue, enqueue_on_commit, job
+
+
+@job('tests.fail_after_write')
+def fail_after_write(name):
+    Group.objects.create(name=name)
+    raise OSError("файла нет")
+
+
+@override_settings(JOBS_RUN_INLINE=True)
+class InlineJobTests(TestCase):
+    def test_failure_after_commit_is_logged(self):
+        with self.assertLogs('apps.jobs', 'ERROR') as logs, \
+                self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                enqueue_on_commit('tests.fail_after_write', {'name': 'после коммита'})
+        self.assertIn('tests.fail_after_write', logs.output[0])
+
+    def test_failure_rolls_back_only_the_job(self):
+        with self.assertLogs('apps.jobs', 'ERROR'):
+            with transaction.atomic():
+                Group.objects.create(name='данные запроса')
+                enqueue('tests.fail_after_write', {'name': 'из задачи'})
+        self.assertTrue(Group.objects.filter(name='данные запроса').exists())
+        self.assertFalse(Group.objects.filter(name='из задачи').exists())
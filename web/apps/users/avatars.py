@@ -0,0 +1,51 @@
+import hashlib
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, features
+
+# Миниатюры аватара: поле модели -> сторона квадрата в пикселях.
+# На страницах аватар рисуется 20–30px, small с запасом под HiDPI-экраны.
+AVATAR_THUMB_SIZES = {
+    'avatar_small': 64,
+    'avatar_large': 256,
+}
+AVATAR_THUMB_DIR = 'avatars/thumbs'
+AVATAR_WEBP = features.check('webp')
+AVATAR_QUALITY = 82
+
+
+def render_thumbnail(image, size):
+    """Квадратная миниатюра без EXIF: (байты, расширение)."""
+    thumb = ImageOps.fit(image, (size, size), Image.LANCZOS)
+    buffer = BytesIO()
+    if AVATAR_WEBP:
+        thumb.save(buffer, 'WEBP', quality=AVATAR_QUALITY, method=6)
+        return buffer.getvalue(), 'webp'
+    if thumb.mode == 'RGBA':
+        thumb.save(buffer, 'PNG', optimize=True)
+        return buffer.getvalue(), 'png'
+    thumb.convert('RGB').save(buffer, 'JPEG', quality=AVATAR_QUALITY, optimize=True, progressive=True)
+    return buffer.getvalue(), 'jpg'
+
+
+def _store(data, ext):
+    # Имя — хеш содержимого: файл по одному адресу никогда не меняется,
+    # поэтому nginx отдает его с вечным кешем, а одинаковые миниатюры не дублируются
+    name = f'{AVATAR_THUMB_DIR}/{hashlib.sha256(data).hexdigest()[:32]}.{ext}'
+    if not default_storage.exists(name):
+        name = default_storage.save(name, ContentFile(data))
+    return name
+
+
+def make_thumbnails(file):
+    """Имена сохраненных миниатюр {поле: имя} для загруженного файла аватара."""
+    file.seek(0)
+    with Image.open(file) as image:
+        # Поворот по EXIF применяем к пикселям, сами метаданные в миниатюру не попадают
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+        names = {field: _store(*render_thumbnail(image, size)) for field, size in AVATAR_THUMB_SIZES.items()}
+    file.seek(0)
+    return names
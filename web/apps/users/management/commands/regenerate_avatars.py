@@ -0,0 +1,33 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from apps.users.avatars import AVATAR_THUMB_SIZES
+
+
+class Command(BaseCommand):
+    help = "Пересоздает миниатюры аватаров (после изменения размеров/формата или для старых загрузок)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--missing', action='store_true', help="Только пользователям без миниатюр")
+
+    def handle(self, *args, missing, **options):
+        users = get_user_model().objects.exclude(avatar='').exclude(avatar=None)
+        if missing:
+            users = users.filter(avatar_small__in=['', None])
+
+        done = failed = 0
+        for user in users.only('id', 'avatar', *AVATAR_THUMB_SIZES).iterator(chunk_size=200):
+            try:
+                user.avatar.open('rb')
+            except OSError:
+                # Оригинала нет на диске
+                failed += 1
+                continue
+            with user.avatar:
+                user.update_avatar_thumbnails()
+            user.save(update_fields=list(AVATAR_THUMB_SIZES))
+            if user.avatar_small:
+                done += 1
+            else:
+                failed += 1
+        self.stdout.write(f"Готово: {done}, без миниатюр: {failed}")
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.14 on 2026-10-18 19:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='avatar_large',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='avatars/thumbs/'),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='avatar_small',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='avatars/thumbs/'),
+        ),
+    ]
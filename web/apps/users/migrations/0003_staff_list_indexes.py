@@ -0,0 +1,49 @@
+# Generated by Django 5.0.14 on 2026-10-18 19:42
+
+from django.db import migrations, models
+
+# Поиск в списке пользователей — istartswith, на PostgreSQL это
+# UPPER(col::text) LIKE UPPER('abc%'). Обычный индекс для такого LIKE не
+# подходит (не C-локаль), нужен функциональный с text_pattern_ops.
+# На SQLite LIKE и так без учета регистра и идет перебором — индекс не создаем.
+POSTGRES_SQL = [
+    'CREATE INDEX IF NOT EXISTS users_username_prefix_idx '
+    'ON users_customuser (UPPER(username::text) text_pattern_ops)',
+    'CREATE INDEX IF NOT EXISTS users_email_prefix_idx '
+    'ON users_customuser (UPPER(email::text) text_pattern_ops)',
+]
+
+POSTGRES_REVERSE_SQL = [
+    'DROP INDEX IF EXISTS users_email_prefix_idx',
+    'DROP INDEX IF EXISTS users_username_prefix_idx',
+]
+
+
+def _run(schema_editor, statements):
+    if schema_editor.connection.vendor == 'postgresql':
+        for sql in statements:
+            schema_editor.execute(sql)
+
+
+def create_prefix_indexes(apps, schema_editor):
+    _run(schema_editor, POSTGRES_SQL)
+
+
+def drop_prefix_indexes(apps, schema_editor):
+    _run(schema_editor, POSTGRES_REVERSE_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0002_avatar_thumbnails'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['date_joined', 'id'], name='users_joined_idx'),
+        ),
+        migrations.RunPython(create_prefix_indexes, drop_prefix_indexes),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations
+
+# Имя группы из apps.users.models.MODERATORS_GROUP; в миграции — копией,
+# чтобы миграция не менялась вместе с кодом
+MODERATORS_GROUP = 'Moderators'
+
+
+def create_moderators_group(apps, schema_editor):
+    Group = apps.get_model('auth', 'Group')
+    Group.objects.get_or_create(name=MODERATORS_GROUP)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0003_staff_list_indexes'),
+    ]
+
+    operations = [
+        # Обратно группу не удаляем: в ней могут быть люди
+        migrations.RunPython(create_moderators_group, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,72 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils.functional import cached_property
+from PIL import Image, UnidentifiedImageError
+
+from apps.jobs.queue import enqueue_on_commit
+
+from .avatars import make_thumbnails
+
+MODERATORS_GROUP = 'Moderators'
+
 
 class CustomUser(AbstractUser):
     is_banned = models.BooleanField(default=False, verbose_name="Забанен")
     avatar = models.ImageField(upload_to='avatars/', null=True, blank=True, verbose_name="Аватар")
+    # Уменьшенные копии аватара, создаются фоновой задачей после загрузки (см. avatars.py, tasks.py)
+    avatar_small = models.ImageField(upload_to='avatars/thumbs/', null=True, blank=True, editable=False)
+    avatar_large = models.ImageField(upload_to='avatars/thumbs/', null=True, blank=True, editable=False)
+
+    class Meta(AbstractUser.Meta):
+        # Список пользователей для модераторов листается по (date_joined, id)
+        indexes = [models.Index(fields=['date_joined', 'id'], name='users_joined_idx')]
+
+    def save(self, *args, **kwargs):
+        new_avatar = bool(self.avatar) and not self.avatar._committed
+        if new_avatar or not self.avatar:
+            # Пока задача не сделала миниатюры нового файла, показывается оригинал
+            self.avatar_small = self.avatar_large = None
+        super().save(*args, **kwargs)
+        if new_avatar:
+            enqueue_on_commit('users.avatar_thumbnails', {'user_id': self.pk},
+                              dedupe_key=f'avatar_thumbnails:{self.pk}')
+
+    def update_avatar_thumbnails(self):
+        try:
+            for field, name in make_thumbnails(self.avatar).items():
+                setattr(self, field, name)
+        except (OSError, UnidentifiedImageError, Image.DecompressionBombError):
+            # Битый файл: без миниатюр будет показан оригинал
+            self.avatar_small = self.avatar_large = None
+
+    @property
+    def avatar_thumb_url(self):
+        if self.avatar_small:
+            return self.avatar_small.url
+        return self.avatar.url if self.avatar else None
+
+    # Группы грузятся одним запросом и запоминаются на объекте пользователя.
+    # request.user создается заново на каждый запрос, так что это кеш ровно на запрос
+    @cached_property
+    def group_names(self):
+        return frozenset(self.groups.values_list('name', flat=True))
 
     def is_moderator(self):
-        return self.groups.filter(name='Moderators').exists() or self.is_superuser
\ No newline at end of file
+        return self.is_superuser or MODERATORS_GROUP in self.group_names
+
+    def can_create_news(self):
+        return self.is_moderator()
+
+    def can_interact(self):
+        return not self.is_banned
+
+    def can_post(self, category):
+        # Создание темы: обычный раздел — все, "Связь с адм" — все, остальные админские — только модеры
+        if self.is_banned:
+            return False
+        if not category.is_admin_only or category.is_feedback:
+            return True
+        return self.is_moderator()
+
+    def can_reply(self, thread):
+        return self.can_post(thread.category)
\ No newline at end of file
@@ -0,0 +1,22 @@
+# Проверки прав, которые можно вызывать и для анонимного пользователя.
+# Вся логика — в методах CustomUser, группы грузятся один раз за запрос.
+
+
+def is_moderator(user):
+    return user.is_authenticated and user.is_active and user.is_moderator()
+
+
+def can_create_news(user):
+    return user.is_authenticated and user.can_create_news()
+
+
+def can_interact(user):
+    return user.is_authenticated and user.can_interact()
+
+
+def can_post(user, category):
+    return user.is_authenticated and user.can_post(category)
+
+
+def can_reply(user, thread):
+    return user.is_authenticated and user.can_reply(thread)
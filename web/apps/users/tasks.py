@@ -0,0 +1,17 @@
+from django.contrib.auth import get_user_model
+
+from apps.jobs.queue import job
+
+from .avatars import AVATAR_THUMB_SIZES
+
+
+@job('users.avatar_thumbnails')
+def avatar_thumbnails(user_id):
+    # Аватар берем текущий: пока задача ждала, пользователь мог загрузить другой
+    user = get_user_model().objects.filter(pk=user_id).only('id', 'avatar', *AVATAR_THUMB_SIZES).first()
+    if user is None or not user.avatar:
+        return
+    # Нет файла на диске — OSError, задача повторится
+    with user.avatar.open('rb'):
+        user.update_avatar_thumbnails()
+    user.save(update_fields=list(AVATAR_THUMB_SIZES))
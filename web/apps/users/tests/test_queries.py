@@ -0,0 +1,65 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from apps.forum.models import Category, News, Thread, ThreadPost
+from apps.users.models import MODERATORS_GROUP
+
+AUTH_TABLES = ('django_session', 'users_customuser', 'auth_group')
+
+
+# Все чтения с основной БД, чтобы запросы считались на одном соединении
+@override_settings(DATABASE_REPLICAS=[])
+class AuthQueryCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('moderator', password='x')
+        cls.user.groups.add(Group.objects.get_or_create(name=MODERATORS_GROUP)[0])
+        # Админский раздел: право писать проверяется через группу
+        cls.category = Category.objects.create(name="Раздел", is_admin_only=True)
+        cls.thread = Thread.objects.create(category=cls.category, title="Тема", content="<p>т</p>", author=cls.user)
+        ThreadPost.objects.create(thread=cls.thread, author=cls.user, content="<p>ответ</p>")
+        News.objects.create(title="Новость", content="<p>н</p>", author=cls.user)
+        cls.pages = ['/', '/forum/', f'/forum/cat/{cls.category.pk}/', f'/forum/thread/{cls.thread.pk}/']
+
+    def setUp(self):
+        cache.clear()
+        ContentType.objects.clear_cache()
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        counts = {table: sum(f'FROM "{table}"' in query['sql'] for query in queries.captured_queries)
+                  for table in AUTH_TABLES}
+        return len(queries), counts
+
+    def test_anonymous_pages_make_no_auth_queries(self):
+        for url in self.pages:
+            with self.subTest(url=url):
+                _, counts = self.get(url)
+                self.assertEqual(counts, dict.fromkeys(AUTH_TABLES, 0))
+
+    def test_anonymous_home(self):
+        with self.assertNumQueries(1):
+            self.client.get('/')
+        # Повторный заход — из кеша страниц для гостей
+        with self.assertNumQueries(0):
+            self.client.get('/')
+
+    def test_logged_in_pages_resolve_user_and_roles_once(self):
+        self.client.force_login(self.user)
+        for url in self.pages:
+            with self.subTest(url=url):
+                _, counts = self.get(url)
+                self.assertEqual(counts, dict.fromkeys(AUTH_TABLES, 1))
+
+    def test_logged_in_home(self):
+        self.client.force_login(self.user)
+        # Сессия, пользователь, новости, тип контента, реакции пользователя, группы пользователя
+        total, _ = self.get('/')
+        self.assertEqual(total, 6)
@@ -4,5 +4,7 @@ from . import views
 urlpatterns = [
     path('', views.register, name='register'),
     path('staff/', views.staff_users_list, name='staff_users_list'),
+    path('staff/ban/', views.bulk_ban, name='bulk_ban'),
     path('staff/ban/<int:user_id>/', views.toggle_ban, name='toggle_ban'),
+    path('staff/db/', views.staff_db_stats, name='staff_db_stats'),
 ]
\ No newline at end of file
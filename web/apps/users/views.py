@@ -1,9 +1,24 @@
-from django.shortcuts import render, redirect, get_object_or_404
+from datetime import timedelta
+from urllib.parse import urlencode
+
+from django.shortcuts import render, redirect
+from django.urls import reverse
 from django.contrib.auth import login
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.decorators import login_required, user_passes_test
-from .models import CustomUser
+from .models import CustomUser, MODERATORS_GROUP
+from .permissions import is_moderator
 from django import forms
+from django.http import JsonResponse
+from django.db import connections
+from django.db.models import Case, Exists, OuterRef, Q, Value, When
+from django.utils import timezone
+from django.views.decorators.http import require_POST
+from apps.forum.pagination import KeysetPaginator
+from project.db.pool import pool_stats
+
+STAFF_USERS_PER_PAGE = 50
+STAFF_RECENT_DAYS = 7
 
 class CustomUserCreationForm(UserCreationForm):
     class Meta:
@@ -22,19 +37,66 @@ def register(request):
     return render(request, 'registration/register.html', {'form': form})
 
 # Управление пользователями для модераторов
-def is_mod(user):
-    return user.is_active and (user.is_superuser or user.groups.filter(name='Moderators').exists())
+def bannable_users():
+    """Пользователи, которых модератор может банить: все, кроме админов и модераторов.
+
+    Условие целиком в SQL (NOT EXISTS по группам), поэтому годится и для списка,
+    и для массового UPDATE.
+    """
+    moderators = CustomUser.groups.through.objects.filter(customuser_id=OuterRef('pk'), group__name=MODERATORS_GROUP)
+    return CustomUser.objects.filter(is_superuser=False).exclude(Exists(moderators))
 
-@user_passes_test(is_mod)
+@user_passes_test(is_moderator)
 def staff_users_list(request):
     # Не показываем админов и модераторов в списке на бан, чтобы случайно не забанить своих
-    users = CustomUser.objects.filter(is_superuser=False).exclude(groups__name='Moderators').order_by('-date_joined')
-    return render(request, 'users/staff_list.html', {'users': users})
+    users = bannable_users().only('id', 'username', 'email', 'is_banned', 'date_joined')
+    query = request.GET.get('q', '').strip()
+    status = request.GET.get('status', '')
+    if query:
+        # Поиск по началу имени или почты (на PostgreSQL — по индексам из миграции 0003)
+        users = users.filter(Q(username__istartswith=query) | Q(email__istartswith=query))
+    if status == 'banned':
+        users = users.filter(is_banned=True)
+    elif status == 'active':
+        users = users.filter(is_banned=False)
+    elif status == 'recent':
+        users = users.filter(date_joined__gte=timezone.now() - timedelta(days=STAFF_RECENT_DAYS))
 
-@user_passes_test(is_mod)
+    page = KeysetPaginator(users, STAFF_USERS_PER_PAGE, keys=('date_joined', 'id'),
+                           descending=True).page_from_request(request)
+    filters = urlencode({key: value for key, value in (('q', query), ('status', status)) if value})
+    return render(request, 'users/staff_list.html',
+                  {'users': page, 'query': query, 'status': status, 'filters': filters})
+
+@user_passes_test(is_moderator)
+@require_POST
+def bulk_ban(request):
+    # Один UPDATE на всех отмеченных; админы и модераторы отсекаются тем же условием, что и в списке.
+    # Кешированных прав нет: is_banned читается из строки пользователя на каждом запросе
+    ids = [int(pk) for pk in request.POST.getlist('user_ids') if pk.isdigit()]
+    if ids:
+        bannable_users().filter(pk__in=ids).update(is_banned=request.POST.get('action') == 'ban')
+    filters = request.POST.get('filters', '')
+    return redirect(reverse('staff_users_list') + (f'?{filters}' if filters else ''))
+
+@user_passes_test(is_moderator)
 def toggle_ban(request, user_id):
-    user = get_object_or_404(CustomUser, id=user_id)
-    if not user.is_superuser and not user.is_moderator():
-        user.is_banned = not user.is_banned
-        user.save()
-    return redirect('staff_users_list')
\ No newline at end of file
+    bannable_users().filter(pk=user_id).update(
+        is_banned=Case(When(is_banned=True, then=Value(False)), default=Value(True)))
+    return redirect('staff_users_list')
+
+# Состояние соединений с БД в текущем воркере (для мониторинга)
+@user_passes_test(lambda user: user.is_superuser)
+def staff_db_stats(request):
+    return JsonResponse({
+        'pools': pool_stats(),
+        'databases': {
+            alias: {
+                'engine': connections.settings[alias]['ENGINE'],
+                'conn_max_age': connections.settings[alias]['CONN_MAX_AGE'],
+                'conn_health_checks': connections.settings[alias]['CONN_HEALTH_CHECKS'],
+                'server_side_cursors': not connections.settings[alias]['DISABLE_SERVER_SIDE_CURSORS'],
+            }
+            for alias in connections
+        },
+    })
\ No newline at end of file
@@ -1,4 +1,10 @@
 #!/bin/sh
+# Режимы запуска:
+#   ./entrypoint.sh release  — один раз на выкладку: миграции и сборка статики
+#   ./entrypoint.sh          — сервер: только проверка, что миграции применены, и gunicorn
+#   ./entrypoint.sh worker   — воркер фоновых задач (manage.py run_jobs)
+# Миграции создаются разработчиком и лежат в репозитории, makemigrations здесь не запускается.
+set -e
 
 if [ "$SQL_DATABASE" = "forum_db" ]
 then
@@ -9,14 +15,26 @@ then
     echo "PostgreSQL started"
 fi
 
-echo "Making migrations..."
-python manage.py makemigrations users
-python manage.py makemigrations forum
-python manage.py makemigrations
+if [ "$1" = "release" ]
+then
+    echo "Migrating..."
+    python manage.py migrate --no-input
+    # Без --clear: файлы прошлой версии (с другим хешем) остаются для страниц, открытых до выкладки
+    echo "Collecting static..."
+    python manage.py collectstatic --no-input
+    exit 0
+fi
 
-echo "Migrating..."
-python manage.py migrate
-python manage.py shell -c "from django.contrib.auth.models import Group; Group.objects.get_or_create(name='Moderators')"
-python manage.py collectstatic --no-input --clear
+if ! python manage.py migrate --check > /dev/null
+then
+    echo "Есть непримененные миграции: сначала запустите ./entrypoint.sh release" >&2
+    exit 1
+fi
+
+if [ "$1" = "worker" ]
+then
+    exec python manage.py run_jobs
+fi
 
-exec gunicorn project.wsgi:application --bind 0.0.0.0:8000 --workers 10 --timeout 120
\ No newline at end of file
+# ASGI-воркеры: обычные вьюхи работают как раньше, а /chat/stream/ держит SSE-соединения
+exec gunicorn project.asgi:application -k uvicorn_worker.UvicornWorker --bind 0.0.0.0:8000 --workers 10 --timeout 120
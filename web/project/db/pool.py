@@ -0,0 +1,180 @@
+import os
+import threading
+import time
+
+from django.db import DatabaseError
+
+
+class PoolTimeout(DatabaseError):
+    pass
+
+
+class ConnectionPool:
+    """Пул соединений с БД внутри одного процесса-воркера.
+
+    Под ASGI каждый запрос выполняется в своем потоке, а Django держит
+    соединения в thread-local, поэтому CONN_MAX_AGE там соединения не
+    переиспользует. Пул общий для всех потоков процесса: в конце запроса
+    соединение возвращается сюда, следующий запрос забирает его без
+    нового подключения к PostgreSQL.
+    """
+
+    def __init__(self, max_size=10, idle_timeout=300, timeout=10, health_checks=False):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.health_checks = health_checks
+        self.pid = os.getpid()
+
+        self._idle = []  # (соединение, время возврата), последнее вернувшееся — в конце
+        self._size = 0   # Открытые соединения: свободные + выданные
+        self._cond = threading.Condition()
+        self._stats = dict.fromkeys(
+            ('created', 'reused', 'closed_idle', 'discarded', 'failed_checks', 'waits', 'timeouts'), 0)
+        self._wait_time = 0.0
+
+    # --- выдача и возврат ---
+    def acquire(self, connect, is_usable):
+        """Свободное соединение из пула или новое через connect()."""
+        while True:
+            conn = self._take()
+            if conn is None:
+                try:
+                    conn = connect()
+                except Exception:
+                    self._forget()
+                    raise
+                self._count('created')
+                return conn
+            if not self.health_checks or is_usable(conn):
+                self._count('reused')
+                return conn
+            # Соединение умерло, пока лежало в пуле (рестарт БД, таймаут на сервере)
+            self._count('failed_checks')
+            self.discard(conn)
+
+    def release(self, conn):
+        if conn.closed:
+            self._forget()
+            return
+        try:
+            if not self._is_idle(conn):
+                conn.rollback()
+        except Exception:
+            self.discard(conn)
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def discard(self, conn):
+        self._count('discarded')
+        self._forget()
+        self._close(conn)
+
+    def _take(self):
+        # None — можно открыть новое соединение (место в пуле уже занято под него)
+        started = None
+        with self._cond:
+            while True:
+                expired = self._prune()
+                if self._idle:
+                    conn = self._idle.pop()[0]
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    conn = None
+                    break
+                now = time.monotonic()
+                if started is None:
+                    started = now
+                    self._stats['waits'] += 1
+                remaining = started + self.timeout - now
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    self._wait_time += now - started
+                    raise PoolTimeout(f"Нет свободного соединения в пуле за {self.timeout} с "
+                                      f"(max_size={self.max_size})")
+                self._cond.wait(remaining)
+            if started is not None:
+                self._wait_time += time.monotonic() - started
+        for old in expired:
+            self._close(old)
+        return conn
+
+    def _prune(self):
+        # Вызывается под блокировкой: убирает соединения, пролежавшие дольше idle_timeout.
+        # Список отсортирован по времени возврата, старые — в начале
+        deadline = time.monotonic() - self.idle_timeout
+        expired = 0
+        while expired < len(self._idle) and self._idle[expired][1] < deadline:
+            expired += 1
+        if not expired:
+            return []
+        old, self._idle = [conn for conn, _ in self._idle[:expired]], self._idle[expired:]
+        self._size -= expired
+        self._stats['closed_idle'] += expired
+        self._cond.notify(expired)
+        return old
+
+    def _forget(self):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def _count(self, name):
+        with self._cond:
+            self._stats[name] += 1
+
+    @staticmethod
+    def _is_idle(conn):
+        # psycopg2: TRANSACTION_STATUS_IDLE == 0 — нет незавершенной транзакции
+        return conn.info.transaction_status == 0
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    # --- мониторинг ---
+    def stats(self):
+        with self._cond:
+            idle = len(self._idle)
+            return {
+                'pid': self.pid,
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': idle,
+                'in_use': self._size - idle,
+                'wait_time_ms': round(self._wait_time * 1000, 1),
+                **self._stats,
+            }
+
+    def close_all(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+        for conn, _ in idle:
+            self._close(conn)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, options):
+    pool = _pools.get(alias)
+    # После fork (gunicorn) пул родителя не используем — его соединения не наши
+    if pool is None or pool.pid != os.getpid():
+        with _pools_lock:
+            pool = _pools.get(alias)
+            if pool is None or pool.pid != os.getpid():
+                pool = _pools[alias] = ConnectionPool(**options)
+    return pool
+
+
+def pool_stats():
+    """Статистика всех пулов текущего процесса: {alias: {...}}."""
+    return {alias: pool.stats() for alias, pool in list(_pools.items()) if pool.pid == os.getpid()}
@@ -0,0 +1,43 @@
+from django.db.backends.postgresql.base import DatabaseWrapper as PostgresDatabaseWrapper
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+
+from project.db.pool import get_pool
+
+
+class DatabaseWrapper(PostgresDatabaseWrapper):
+    """Бэкенд PostgreSQL, который берет соединения из пула процесса.
+
+    Параметры пула — в DATABASES[alias]['POOL'] (см. settings.py).
+    CONN_MAX_AGE должен быть 0: в конце запроса Django "закрывает"
+    соединение, и оно возвращается в пул.
+    """
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, self.settings_dict['POOL'])
+
+    def get_new_connection(self, conn_params):
+        connection = self.pool.acquire(lambda: super(DatabaseWrapper, self).get_new_connection(conn_params),
+                                       self._connection_is_usable)
+        # super() выставляет уровень изоляции только для новых соединений
+        level = self.settings_dict['OPTIONS'].get('isolation_level')
+        self.isolation_level = IsolationLevel(level) if level is not None else IsolationLevel.READ_COMMITTED
+        return connection
+
+    @staticmethod
+    def _connection_is_usable(connection):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except Exception:
+            return False
+        return True
+
+    def _close(self):
+        if self.connection is None:
+            return
+        if self.in_atomic_block:
+            # Django оставит ссылку на соединение до конца atomic() — отдавать его другим нельзя
+            self.pool.discard(self.connection)
+        else:
+            self.pool.release(self.connection)
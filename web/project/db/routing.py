@@ -0,0 +1,84 @@
+import functools
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.utils.deprecation import MiddlewareMixin
+
+# Чтение с реплик включается только на время вьюх, помеченных use_replica.
+# Все остальное (команды, админка, POST-обработчики) читает с основной БД.
+# ContextVar, как и в project/instrumentation.py: под ASGI синхронная вьюха
+# выполняется в другом потоке с копией контекста
+_read_from_replica = ContextVar('read_from_replica', default=False)
+
+# Кука "читать с основной БД": ставится после любого изменяющего запроса,
+# чтобы пользователь сразу увидел свой пост или реакцию, а не отстающую реплику
+PIN_COOKIE = 'pin_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Сессии читаем только с основной БД: иначе только что вошедший пользователь
+# на отстающей реплике окажется разлогиненным
+PRIMARY_ONLY_APPS = {'sessions'}
+
+
+class ReplicaRouter:
+    """Чтение — со случайной реплики из settings.DATABASE_REPLICAS внутри use_replica-вьюх, запись — в default."""
+
+    def db_for_read(self, model, **hints):
+        if (_read_from_replica.get() and settings.DATABASE_REPLICAS
+                and model._meta.app_label not in PRIMARY_ONLY_APPS):
+            return random.choice(settings.DATABASE_REPLICAS)
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная БД
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схему на реплики приносит репликация
+        return db not in settings.DATABASE_REPLICAS
+
+
+def use_replica(view):
+    """Декоратор вьюхи: GET/HEAD-запросы читают с реплики, если пользователь не закреплен за основной БД."""
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if (not settings.DATABASE_REPLICAS or request.method not in ('GET', 'HEAD')
+                or PIN_COOKIE in request.COOKIES):
+            return view(request, *args, **kwargs)
+        token = _read_from_replica.set(True)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _read_from_replica.reset(token)
+    return wrapper
+
+
+@contextmanager
+def primary_reads():
+    """Внутри блока чтение с основной БД, даже во вьюхе с use_replica.
+
+    Для всего, что попадает в общий кеш: страница или фрагмент, собранные с
+    отстающей реплики сразу после изменения, остались бы в кеше под новым
+    штампом версии до следующего изменения.
+    """
+    token = _read_from_replica.set(False)
+    try:
+        yield
+    finally:
+        _read_from_replica.reset(token)
+
+
+class PinToPrimaryMiddleware(MiddlewareMixin):
+    """После POST (и других изменяющих запросов) читаем с основной БД REPLICA_PIN_SECONDS секунд."""
+
+    def process_response(self, request, response):
+        if (settings.DATABASE_REPLICAS and request.method not in SAFE_METHODS
+                and response.status_code < 500):
+            response.set_cookie(PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS,
+                                httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,207 @@
+import json
+import logging
+import random
+import re
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.db.backends.signals import connection_created
+from django.template.backends.django import DjangoTemplates, Template
+from django.utils.functional import empty
+
+logger = logging.getLogger('project.requests')
+
+# Метрики текущего запроса. ContextVar, а не thread-local: под ASGI синхронная
+# вьюха выполняется в другом потоке, но с копией контекста middleware
+_current = ContextVar('request_metrics', default=None)
+
+# Сколько разных SQL запоминать на запрос (защита от страниц с тысячами разных запросов)
+MAX_FINGERPRINTS = 200
+
+_in_list_re = re.compile(r'IN \((?:%s, )*%s\)')
+
+
+def fingerprint(sql):
+    # Параметры и так отделены от SQL, схлопываем только списки IN (%s, %s, ...)
+    return _in_list_re.sub('IN (...)', sql)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_started = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.sql = {}  # отпечаток -> [число, время]
+
+    def add_query(self, sql, elapsed):
+        self.queries += 1
+        self.db_time += elapsed
+        key = fingerprint(sql)
+        entry = self.sql.get(key)
+        if entry is not None:
+            entry[0] += 1
+            entry[1] += elapsed
+        elif len(self.sql) < MAX_FINGERPRINTS:
+            self.sql[key] = [1, elapsed]
+
+    @property
+    def duplicates(self):
+        # Повторы одного и того же запроса — признак N+1
+        return sum(count - 1 for count, _ in self.sql.values())
+
+    def top_sql(self, limit):
+        repeated = [(sql, count, spent) for sql, (count, spent) in self.sql.items() if count > 1]
+        repeated.sort(key=lambda item: (item[1], item[2]), reverse=True)
+        return [{'sql': sql[:500], 'count': count, 'ms': round(spent * 1000, 2)}
+                for sql, count, spent in repeated[:limit]]
+
+
+# --- SQL ---
+def _execute_wrapper(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add_query(sql, time.perf_counter() - started)
+
+
+def _install_wrapper(sender, connection, **kwargs):
+    # Обертка висит на соединении постоянно и ничего не делает вне замеряемых запросов
+    if _execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute_wrapper)
+
+
+connection_created.connect(_install_wrapper)
+
+
+# --- шаблоны ---
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_time += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Бэкенд шаблонов Django, который засекает время рендера (вместе с запросами из шаблона)."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
+
+
+# --- middleware ---
+def _ms(seconds):
+    return round(seconds * 1000, 2)
+
+
+def _user_id(request):
+    # Только то, что вьюха уже загрузила: под ASGI _finish работает в event loop,
+    # и ленивый request.user или сессия полезли бы в БД из асинхронного кода
+    user = getattr(request, 'user', None)
+    if user is not None and getattr(user, '_wrapped', None) is not empty:
+        return user.pk
+    session = getattr(request, 'session', None)
+    if session is not None and hasattr(session, '_session_cache'):
+        return session.get(SESSION_KEY)
+    return None
+
+
+def _finish(request, response, metrics):
+    total = time.perf_counter() - metrics.started
+    view = time.perf_counter() - metrics.view_started if metrics.view_started else total
+
+    if settings.REQUEST_METRICS_HEADER:
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={_ms(metrics.db_time)};desc="{metrics.queries} queries, {metrics.duplicates} dup"',
+            f'tpl;dur={_ms(metrics.template_time)}',
+            f'view;dur={_ms(view)}',
+            f'total;dur={_ms(total)}',
+        ])
+
+    if total * 1000 >= settings.SLOW_REQUEST_MS:
+        entry = {
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'user_id': _user_id(request),
+            'total_ms': _ms(total),
+            'view_ms': _ms(view),
+            'db_ms': _ms(metrics.db_time),
+            'template_ms': _ms(metrics.template_time),
+            'queries': metrics.queries,
+            'duplicates': metrics.duplicates,
+            'top_sql': metrics.top_sql(settings.SLOW_REQUEST_TOP_SQL),
+        }
+        logger.warning('slow request %s', json.dumps(entry, ensure_ascii=False), extra={'metrics': entry})
+    return response
+
+
+class RequestMetricsMiddleware:
+    """Число и время SQL-запросов, дубликаты, время шаблонов и вьюхи на каждый запрос.
+
+    Результат — заголовок Server-Timing (виден во вкладке Network браузера)
+    и запись в лог project.requests для запросов дольше SLOW_REQUEST_MS.
+    Замеряется доля запросов REQUEST_METRICS_SAMPLE_RATE, остальные проходят
+    без накладных расходов. Ставить первым в MIDDLEWARE.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def _sampled(self):
+        rate = settings.REQUEST_METRICS_SAMPLE_RATE
+        return rate >= 1 or (rate > 0 and random.random() < rate)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self._sampled():
+            return self.get_response(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        request._metrics = metrics
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return _finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        if not self._sampled():
+            return await self.get_response(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        request._metrics = metrics
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return _finish(request, response, metrics)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = getattr(request, '_metrics', None)
+        if metrics is not None:
+            metrics.view_started = time.perf_counter()
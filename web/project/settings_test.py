@@ -0,0 +1,27 @@
+"""Настройки для тестов: python manage.py test --settings=project.settings_test"""
+import os
+import tempfile
+
+os.environ.setdefault('DJANGO_ALLOWED_HOSTS', 'localhost testserver')
+
+from .settings import *  # noqa: E402,F401,F403
+from .settings import DATABASES
+
+# SQLite в памяти с общим кешем блокирует таблицы без ожидания, а тестам
+# с потоками нужна обычная блокировка с таймаутом — тестовая БД в файле
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    DATABASES['default']['TEST'] = {'NAME': os.path.join(tempfile.gettempdir(), 'simple_forum_test.sqlite3')}
+
+# Реплика-зеркало: в тестах это то же соединение с тестовой БД, что и default,
+# но запросы к ней видны отдельно — так проверяется маршрутизация чтения
+if not DATABASE_REPLICAS:  # noqa: F405
+    DATABASES['replica_0'] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS = ['replica_0']
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+# Тесты сами включают то, что проверяют
+RATE_LIMIT_ENABLED = False
+JOBS_RUN_INLINE = True
+REQUEST_METRICS_SAMPLE_RATE = 0
+# Тесты идут с DEBUG=False, а collectstatic перед ними не запускается
+STORAGES = {**STORAGES, 'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}}  # noqa: F405
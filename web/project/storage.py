@@ -0,0 +1,49 @@
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # Без пакета Brotli собираются только .gz
+    brotli = None
+
+# Что имеет смысл сжимать: картинки и шрифты woff/woff2 уже сжаты
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.mjs', '.map', '.svg', '.json', '.txt', '.xml', '.html', '.ico',
+                           '.ttf', '.otf', '.eot')
+MIN_COMPRESS_SIZE = 256
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Статика с хешем содержимого в имени (app.3f2a1c9b8e7d.css) и сжатыми копиями рядом.
+
+    collectstatic кладет рядом с каждым текстовым файлом .gz (и .br, если
+    установлен Brotli) — nginx отдает их сам через gzip_static/brotli_static,
+    не сжимая на каждый запрос. Файлы с хешем в имени никогда не меняются,
+    поэтому nginx отдает их с Cache-Control: immutable.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        collected = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            yield name, hashed_name, processed
+            if not isinstance(processed, Exception) and hashed_name:
+                collected.update((name, hashed_name))
+        if dry_run:
+            return
+        for name in sorted(collected):
+            if name.endswith(COMPRESSIBLE_EXTENSIONS):
+                self._write_compressed(name)
+
+    def _write_compressed(self, name):
+        with self.open(name) as source:
+            data = source.read()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return
+        variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append(('.br', brotli.compress(data, quality=11)))
+        for suffix, compressed in variants:
+            # Сжатая копия, которая не меньше оригинала, только мешает
+            if len(compressed) < len(data):
+                with open(self.path(name + suffix), 'wb') as target:
+                    target.write(compressed)
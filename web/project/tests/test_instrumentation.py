@@ -0,0 +1,26 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+
+@override_settings(REQUEST_METRICS_SAMPLE_RATE=1, SLOW_REQUEST_MS=0, DATABASE_REPLICAS=[])
+class SlowRequestLogTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('reader', password='x')
+
+    async def get_logged(self, url):
+        await self.async_client.aforce_login(self.user)
+        with self.assertLogs('project.requests', 'WARNING') as logs:
+            response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, logs.records[-1].metrics
+
+    async def test_async_view_does_not_load_user(self):
+        # Асинхронная вьюха не трогает request.user — лог не должен грузить его из event loop
+        response, entry = await self.get_logged('/chat/stream/')
+        self.assertIsNone(entry['user_id'])
+        await response.streaming_content.aclose()
+
+    async def test_loaded_user_is_logged(self):
+        _, entry = await self.get_logged('/forum/')
+        self.assertEqual(entry['user_id'], self.user.pk)
@@ -0,0 +1,51 @@
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from apps.forum.models import Category, Thread
+from project.db.routing import PIN_COOKIE
+
+FORUM_TABLE = Category._meta.db_table
+
+
+# Реплика — зеркало тестовой БД (settings_test: TEST['MIRROR'] = 'default'): данные те же,
+# а запросы видны на своем соединении. TransactionTestCase — зеркало не видит
+# незакоммиченную транзакцию TestCase
+@override_settings(DATABASE_REPLICAS=['replica_0'])
+class ReplicaRoutingTests(TransactionTestCase):
+    databases = {'default', 'replica_0'}
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('reader', password='x')
+        category = Category.objects.create(name="Раздел")
+        self.thread = Thread.objects.create(category=category, title="Тема", content="<p>т</p>", author=self.user)
+        self.client.force_login(self.user)
+
+    def get(self, url):
+        """Таблицы, прочитанные при запросе: (с основной БД, с реплики)."""
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica_0']) as replica:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return primary.captured_queries, replica.captured_queries
+
+    def reads(self, queries, table):
+        return [q['sql'] for q in queries if q['sql'].startswith('SELECT') and f'FROM "{table}"' in q['sql']]
+
+    def test_get_reads_from_replica(self):
+        primary, replica = self.get('/forum/')
+        self.assertTrue(self.reads(replica, FORUM_TABLE))
+        self.assertEqual(self.reads(primary, FORUM_TABLE), [])
+        # Сессия — только с основной БД
+        self.assertTrue(self.reads(primary, 'django_session'))
+        self.assertEqual(self.reads(replica, 'django_session'), [])
+
+    def test_post_pins_next_request_to_primary(self):
+        response = self.client.post(f'/api/reaction/thread/{self.thread.pk}/1/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        primary, replica = self.get('/forum/')
+        self.assertEqual(replica, [])
+        self.assertTrue(self.reads(primary, FORUM_TABLE))